@@ -1,10 +1,4 @@
-from .analysis_functions import (
-    analyze_loan_amount_distribution,
-    grade_vs_defaults,
-    state_wise_defaults,
-    risk_factors_analysis,
-    temporal_default_trends,
-)
+import importlib
 
 __all__ = [
     "analyze_loan_amount_distribution",
@@ -12,4 +6,11 @@ __all__ = [
     "state_wise_defaults",
     "risk_factors_analysis",
     "temporal_default_trends",
-]
\ No newline at end of file
+    "fill_summaries",
+]
+
+def __getattr__(name):
+    # Load the analysis functions (and pandas with them) only when first accessed
+    if name in __all__:
+        return getattr(importlib.import_module(".analysis_functions", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,19 +1,32 @@
 import pandas as pd
-import matplotlib
-import matplotlib.pyplot as plt
-import io
-import base64
 import os
-from app.utils.chatgpt import generate_summary
+from app.analysis.charts import EAGER_CHART_IMAGES, histogram_chart, category_chart, line_chart, render_chart
+from app.utils.chatgpt import generate_summary, generate_summaries
 from app.services.supabase_client import get_data
 from app.utils.data_normalization import normalize_column, normalize_term, normalize_emp_length
 from app.constants.database import TABLE_NAME  # Import TABLE_NAME from constants
 
-# Set the matplotlib backend to a non-GUI backend
-matplotlib.use("Agg")  # This ensures plots are not rendered visually
-
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+def attach_chart(result, chart):
+    """Attach the numeric chart data, rendering the PNG now only when eager images are enabled."""
+    result["chart"] = chart
+    if EAGER_CHART_IMAGES:
+        result["image"] = render_chart(chart)
+    return result
+
+async def fill_summaries(results):
+    """Generate the pending summaries of several analysis results in one concurrent batch.
+
+    Analyses store their ChatGPT request as a (statistics, prompt) pair under "summary_request";
+    it is replaced by the generated "summary" (or an error message if generation failed).
+    """
+    pending = [result for result in results if "summary_request" in result]
+    summaries = await generate_summaries([result.pop("summary_request") for result in pending])
+    for result, summary in zip(pending, summaries):
+        result["summary"] = f"Error generating summary: {str(summary)}" if isinstance(summary, ValueError) else summary
+    return results
+
 async def analyze_loan_amount_distribution():
     """Analyze and visualize the distribution of loan amounts and generate a summary."""
     data = await get_data(TABLE_NAME)
@@ -27,26 +40,17 @@ async def analyze_loan_amount_distribution():
     if df["loan_amnt"].isnull().all():
         raise ValueError("Loan amount data contains only invalid values.")
 
-    # Generate a histogram
-    plt.figure(figsize=(10, 6))
-    df["loan_amnt"].plot(kind="hist", bins=50, color="skyblue", edgecolor="black")
-    plt.title("Distribution of Loan Amounts")
-    plt.xlabel("Loan Amount")
-    plt.ylabel("Frequency")
-    plt.tight_layout()
-
-    # Save to base64 image
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-    buffer.close()
-    plt.close()  # Close the plot to free memory
-
-    # Generate a summary using ChatGPT
-    summary = await generate_summary(
-        statistics=df["loan_amnt"].describe(),
-        prompt=(
+    # Bin the loan amounts for the histogram
+    chart = histogram_chart(df["loan_amnt"], title="Distribution of Loan Amounts", x_label="Loan Amount")
+
+    return await summarize_loan_distribution(df["loan_amnt"].describe(), chart)
+
+async def summarize_loan_distribution(statistics, chart):
+    """Build the loan distribution result from describe()-style statistics and a histogram chart."""
+    # Summary request for ChatGPT, generated with the other analyses by fill_summaries
+    summary_request = (
+        statistics,
+        (
             "The dataset contains information about the distribution of loan amounts (loan_amt). "
             "Analyze the following statistical summary and provide an insightful interpretation:\n\n"
             "{statistics}\n\n"
@@ -61,7 +65,7 @@ async def analyze_loan_amount_distribution():
         ),
     )
 
-    return {"image": f"data:image/png;base64,{encoded_image}", "summary": summary}
+    return attach_chart({"summary_request": summary_request}, chart)
 
 async def grade_vs_defaults():
     """Identify which loan grade is most frequently associated with defaults and generate a summary."""
@@ -75,25 +79,26 @@ async def grade_vs_defaults():
 
     # Group by grade and calculate default counts
     grade_defaults = df[df["is_bad"] == 1].groupby("grade").size()
+    grade_loan_counts = df.groupby("grade").size()
+
+    return await summarize_grade_defaults(grade_defaults, grade_loan_counts)
+
+async def summarize_grade_defaults(grade_defaults, grade_loan_counts):
+    """Chart and summarize default counts per grade."""
     grade_defaults = grade_defaults.sort_values(ascending=False)
 
-    # Visualization
-    plt.figure(figsize=(8, 5))
-    grade_defaults.plot(kind="bar", color="salmon")
-    plt.title("Loan Grades Associated with Defaults")
-    plt.xlabel("Grade")
-    plt.ylabel("Number of Defaults")
-    plt.tight_layout()
-
-    # Save the chart to base64 image
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-    buffer.close()
-    plt.close()  # Close the plot to free memory
-
-    # Generate a summary using ChatGPT
+    # Chart data: default counts with the loan counts and default rates behind them
+    chart = category_chart(
+        grade_defaults,
+        title="Loan Grades Associated with Defaults",
+        x_label="Grade",
+        y_label="Number of Defaults",
+        color="salmon",
+        loans=grade_loan_counts,
+        default_rate=grade_defaults / grade_loan_counts,
+    )
+
+    # Summary request for ChatGPT, generated later by fill_summaries
     grade_summary_stats = grade_defaults.to_string()  # Convert summary stats to a string format
     prompt = (
         f"The dataset contains information about loan grades and their default counts. "
@@ -105,13 +110,11 @@ async def grade_vs_defaults():
         f"3. Any notable patterns or observations from the data.\n\n"
         f"Make the summary simple and easy to understand for someone without a technical background."
     )
-    summary = await generate_summary(statistics=grade_summary_stats, prompt=prompt)
 
-    return {
-        "image": f"data:image/png;base64,{encoded_image}",
+    return attach_chart({
         "table": grade_defaults.to_dict(),
-        "summary": summary,
-    }
+        "summary_request": (grade_summary_stats, prompt),
+    }, chart)
 
 async def state_wise_defaults():
     """Evaluate state-wise loan distributions and default rates."""
@@ -124,29 +127,29 @@ async def state_wise_defaults():
     # Calculate state-wise loan counts and default rates
     state_loan_counts = df.groupby("addr_state").size()
     state_defaults = df[df["is_bad"] == 1].groupby("addr_state").size()
+
+    return await summarize_state_defaults(state_loan_counts, state_defaults)
+
+async def summarize_state_defaults(state_loan_counts, state_defaults):
+    """Chart and summarize default rates per state."""
     default_rates = (state_defaults / state_loan_counts).fillna(0).sort_values(ascending=False)
 
     # Highlight states with the highest and lowest default rates
     highest_default_rate = default_rates.head(5)
     lowest_default_rate = default_rates.tail(5)
 
-    # Visualization
-    plt.figure(figsize=(12, 6))
-    default_rates.plot(kind="bar", color="orange")
-    plt.title("State-Wise Default Rates")
-    plt.xlabel("State")
-    plt.ylabel("Default Rate")
-    plt.tight_layout()
-
-    # Save to base64 image
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-    buffer.close()
-    plt.close()  # Close the plot to free memory
-
-    # Generate summary using ChatGPT
+    # Chart data: default rates with the loan and default counts behind them
+    chart = category_chart(
+        default_rates,
+        title="State-Wise Default Rates",
+        x_label="State",
+        y_label="Default Rate",
+        color="orange",
+        loans=state_loan_counts,
+        defaults=state_defaults,
+    )
+
+    # Summary request for ChatGPT, generated later by fill_summaries
     summary_prompt = (
         f"The dataset contains information about state-wise loan distributions and default rates. "
         f"Here are the calculated default rates for each state:\n\n"
@@ -158,14 +161,12 @@ async def state_wise_defaults():
         f"4. Any significant trends or clusters observed in the data.\n\n"
         f"Write the summary in simple terms for easy understanding."
     )
-    summary = await generate_summary(default_rates.to_string(), summary_prompt)
 
-    return {
-        "image": f"data:image/png;base64,{encoded_image}",
+    return attach_chart({
         "highest_default_rate": highest_default_rate.to_dict(),
         "lowest_default_rate": lowest_default_rate.to_dict(),
-        "summary": summary,
-    }
+        "summary_request": (default_rates.to_string(), summary_prompt),
+    }, chart)
 
 async def risk_factors_analysis():
     """Analyze factors contributing to high-default loans."""
@@ -173,6 +174,10 @@ async def risk_factors_analysis():
     data = await get_data(TABLE_NAME)
     df = pd.DataFrame(data)
 
+    return await analyze_risk_factors_frame(df)
+
+async def analyze_risk_factors_frame(df):
+    """Correlate loan attributes with defaults for a DataFrame of loans (or a sample of them)."""
     # Check for required columns
     if "is_bad" not in df:
         raise ValueError("Column 'is_bad' is missing in the dataset.")
@@ -209,23 +214,15 @@ async def risk_factors_analysis():
     most_correlated = {k: v for k, v in sorted(correlation_data.items(), key=lambda item: -item[1])[:5]}
     least_correlated = {k: v for k, v in sorted(correlation_data.items(), key=lambda item: item[1])[:5]}
 
-    # Visualization: Create a bar chart for the top 10 correlated factors
-    plt.figure(figsize=(12, 6))
-    correlation[:10].plot(kind="bar", color="skyblue", edgecolor="black")
-    plt.title("Top 10 Factors Correlated with Defaults")
-    plt.xlabel("Factors")
-    plt.ylabel("Correlation Coefficient")
-    plt.tight_layout()
-
-    # Save to base64 image
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-    buffer.close()
-    plt.close()  # Free up memory
-
-    # Generate a summary using ChatGPT
+    # Chart data: the top 10 correlated factors
+    chart = category_chart(
+        correlation[:10],
+        title="Top 10 Factors Correlated with Defaults",
+        x_label="Factors",
+        y_label="Correlation Coefficient",
+    )
+
+    # Summary request for ChatGPT, generated later by fill_summaries
     statistics = {
         "most_correlated": most_correlated,
         "least_correlated": least_correlated,
@@ -244,18 +241,12 @@ async def risk_factors_analysis():
         f"could be used to refine risk assessment models. Include actionable recommendations for improving creditworthiness evaluation."
     )
 
-    try:
-        summary = await generate_summary(statistics, prompt)
-    except ValueError as e:
-        summary = f"Error generating summary: {str(e)}"
-
-    return {
+    return attach_chart({
         "correlation_with_defaults": correlation_data,
         "most_correlated": most_correlated,
         "least_correlated": least_correlated,
-        "summary": summary,
-        "image": f"data:image/png;base64,{encoded_image}",
-    }
+        "summary_request": (statistics, prompt),
+    }, chart)
 
 
 async def temporal_default_trends():
@@ -293,32 +284,23 @@ async def temporal_default_trends():
         raise ValueError("No rows with 'is_bad == True'. The dataset contains no loan defaults.")
     yearly_defaults = df[df["is_bad"]].groupby("issue_year").size()
 
+    return await summarize_temporal_trends(yearly_defaults)
+
+async def summarize_temporal_trends(yearly_defaults):
+    """Chart and summarize yearly default counts."""
     # Check if data exists for plotting
     if yearly_defaults.empty:
         raise ValueError("No default data available for plotting. Check the dataset for missing or invalid data.")
 
-    # Plot yearly default trends
-    plt.figure(figsize=(10, 6))
-    yearly_defaults.plot(kind="line", marker="o", color="blue")
-    plt.title("Yearly Default Trends")
-    plt.xlabel("Year")
-    plt.ylabel("Number of Defaults")
-    plt.tight_layout()
-
-    # Save the plot as a base64 image
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-    buffer.close()
-    plt.close()
+    # Chart data: yearly default trends
+    chart = line_chart(yearly_defaults, title="Yearly Default Trends", x_label="Year", y_label="Number of Defaults")
 
     # Prepare statistics for summary generation
     statistics = {
         "yearly_defaults": yearly_defaults.to_dict()
     }
 
-    # Generate summary using ChatGPT
+    # Summary request for ChatGPT, generated later by fill_summaries
     prompt = (
         f"The dataset contains yearly trends in loan defaults based on the column 'earliest_cr_line'.\n\n"
         f"Yearly Default Counts:\n{yearly_defaults.to_string()}\n\n"
@@ -330,15 +312,7 @@ async def temporal_default_trends():
         f"4. Justify why this additional analysis is important and outline a preliminary exploration or plan."
     )
 
-    try:
-        summary = await generate_summary(statistics, prompt)
-    except ValueError as e:
-        summary = f"Error generating summary: {str(e)}"
-
-    return {
-        "image": f"data:image/png;base64,{encoded_image}",
-        "summary": summary,
-    }
+    return attach_chart({"summary_request": (statistics, prompt)}, chart)
 
 async def generate_final_report(
     loan_distribution, grade_defaults, state_defaults, risk_factors, temporal_trends
@@ -356,27 +330,13 @@ async def generate_final_report(
 
         # Create a single visualization summarizing key findings
         # Example: Comparing most significant risk factors
-        df_risk_factors = pd.DataFrame(
-            risk_factors["most_correlated"].items(), columns=["Factor", "Correlation"]
-        )
-        plt.figure(figsize=(10, 6))
-        plt.barh(
-            df_risk_factors["Factor"],
-            df_risk_factors["Correlation"],
-            color="skyblue",
+        chart = category_chart(
+            pd.Series(risk_factors["most_correlated"]),
+            title="Top Risk Factors Associated with Loan Defaults",
+            x_label="Correlation with Defaults",
+            y_label="Risk Factor",
+            kind="barh",
         )
-        plt.title("Top Risk Factors Associated with Loan Defaults")
-        plt.xlabel("Correlation with Defaults")
-        plt.ylabel("Risk Factor")
-        plt.tight_layout()
-
-        # Save the visualization to a base64 image
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format="png")
-        buffer.seek(0)
-        encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
-        buffer.close()
-        plt.close()  # Free memory
 
         # Generate final summary using ChatGPT
         prompt = (
@@ -387,10 +347,7 @@ async def generate_final_report(
         )
         final_summary = await generate_summary(findings, prompt)
 
-        return {
-            "summary": final_summary,
-            "image": f"data:image/png;base64,{encoded_image}",
-        }
+        return attach_chart({"summary": final_summary}, chart)
 
     except Exception as e:
         return {"error": f"Failed to generate report: {str(e)}"}
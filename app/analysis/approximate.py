@@ -0,0 +1,178 @@
+import math
+import os
+
+import pandas as pd
+
+from app.analysis.analysis_functions import (
+    summarize_loan_distribution,
+    summarize_grade_defaults,
+    summarize_state_defaults,
+    analyze_risk_factors_frame,
+    summarize_temporal_trends,
+)
+from app.analysis.charts import HISTOGRAM_MAX_BINS, binned_histogram_chart
+from app.analysis.sketches import KLLSketch, StreamingMoments, FixedWidthHistogram, CategoryCounter, ReservoirSample
+from app.services.supabase_client import iter_data
+from app.constants.database import TABLE_NAME  # Import TABLE_NAME from constants
+
+# Sketch parameters for the approximate analytics mode
+APPROX_QUANTILE_K = int(os.getenv("APPROX_QUANTILE_K", "200"))
+APPROX_HISTOGRAM_BIN_WIDTH = float(os.getenv("APPROX_HISTOGRAM_BIN_WIDTH", "500"))
+APPROX_SAMPLE_SIZE = int(os.getenv("APPROX_SAMPLE_SIZE", "10000"))
+
+class LoanSketches:
+    """Mergeable sketches of the loans table, built in one streaming pass over pages of rows."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = set()
+        self.loan_amounts = KLLSketch(k=APPROX_QUANTILE_K)
+        self.loan_moments = StreamingMoments()
+        self.loan_histogram = FixedWidthHistogram(APPROX_HISTOGRAM_BIN_WIDTH)
+        self.grade_loans = CategoryCounter()
+        self.grade_defaults = CategoryCounter()
+        self.state_loans = CategoryCounter()
+        self.state_defaults = CategoryCounter()
+        self.yearly_defaults = CategoryCounter()
+        self.sample = ReservoirSample(APPROX_SAMPLE_SIZE)
+
+    def update(self, rows: list):
+        """Add a page of rows (e.g. from `iter_data` or an upload chunk)."""
+        df = pd.DataFrame(rows)
+        self.rows += len(df)
+        self.columns.update(df.columns)
+        self.sample.update(rows)
+
+        if "loan_amnt" in df:
+            amounts = pd.to_numeric(df["loan_amnt"], errors="coerce").to_numpy(dtype=float)
+            self.loan_amounts.update(amounts)
+            self.loan_moments.update(amounts)
+            self.loan_histogram.update(amounts)
+
+        # The remaining counters split loans by whether they defaulted
+        if "is_bad" not in df:
+            return
+        is_bad = df["is_bad"] == 1
+
+        if "grade" in df:
+            self.grade_loans.update(df["grade"].dropna())
+            self.grade_defaults.update(df.loc[is_bad, "grade"].dropna())
+
+        if "addr_state" in df:
+            self.state_loans.update(df["addr_state"].dropna())
+            self.state_defaults.update(df.loc[is_bad, "addr_state"].dropna())
+
+        if "earliest_cr_line" in df:
+            dates = pd.to_datetime(df["earliest_cr_line"], format="%m/%d/%y", errors="coerce")
+            self.yearly_defaults.update(dates[is_bad & dates.notnull()].dt.year.astype(int).tolist())
+
+    def merge(self, other: "LoanSketches"):
+        """Merge sketches built over another batch of rows."""
+        self.rows += other.rows
+        self.columns |= other.columns
+        for name in (
+            "loan_amounts",
+            "loan_moments",
+            "loan_histogram",
+            "grade_loans",
+            "grade_defaults",
+            "state_loans",
+            "state_defaults",
+            "yearly_defaults",
+            "sample",
+        ):
+            getattr(self, name).merge(getattr(other, name))
+
+    def require(self, *columns):
+        """Raise if any of the columns never appeared in the streamed rows."""
+        missing = [column for column in columns if column not in self.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} are missing in the dataset.")
+
+async def build_loan_sketches(page_size: int = 1000) -> LoanSketches:
+    """Stream the loans table page by page into a set of sketches."""
+    sketches = LoanSketches()
+    async for page in iter_data(TABLE_NAME, page_size=page_size):
+        sketches.update(page)
+    return sketches
+
+def counts_series(counter: CategoryCounter) -> pd.Series:
+    """Convert a category counter to a pandas Series, matching groupby().size()."""
+    return pd.Series(counter.counts(), dtype="int64")
+
+def mark_approximate(result: dict, **error_bounds) -> dict:
+    """Flag an analysis result as approximate and attach its error bounds."""
+    result["approximate"] = True
+    result["error_bounds"] = error_bounds
+    return result
+
+async def approximate_loan_distribution(sketches: LoanSketches):
+    """Loan amount distribution from the quantile sketch, exact moments and fixed-width histogram."""
+    sketches.require("loan_amnt")
+    moments = sketches.loan_moments
+    if moments.n == 0:
+        raise ValueError("Loan amount data contains only invalid values.")
+
+    quartiles = sketches.loan_amounts.quantiles([0.25, 0.5, 0.75])
+    statistics = pd.Series(
+        {
+            "count": float(moments.n),
+            "mean": moments.mean,
+            "std": moments.std,
+            "min": moments.minimum,
+            "25%": quartiles[0],
+            "50%": quartiles[1],
+            "75%": quartiles[2],
+            "max": moments.maximum,
+        },
+        name="loan_amnt",
+    )
+    bin_start, bin_end, counts = sketches.loan_histogram.bins(HISTOGRAM_MAX_BINS)
+    chart = binned_histogram_chart(
+        bin_start,
+        bin_end,
+        counts,
+        title="Distribution of Loan Amounts",
+        x_label="Loan Amount",
+        binning=f"fixed width {bin_end[0] - bin_start[0]:g}",
+    )
+
+    result = await summarize_loan_distribution(statistics, chart)
+    return mark_approximate(
+        result,
+        quantile_rank_error=sketches.loan_amounts.rank_error,
+        histogram_bin_width=float(bin_end[0] - bin_start[0]),
+    )
+
+async def approximate_grade_defaults(sketches: LoanSketches):
+    """Default counts per grade from the category counters."""
+    sketches.require("grade", "is_bad")
+    result = await summarize_grade_defaults(counts_series(sketches.grade_defaults), counts_series(sketches.grade_loans))
+    return mark_approximate(result, count_error=max(sketches.grade_defaults.error_bound, sketches.grade_loans.error_bound))
+
+async def approximate_state_defaults(sketches: LoanSketches):
+    """Default rates per state from the category counters."""
+    sketches.require("addr_state", "is_bad")
+    result = await summarize_state_defaults(counts_series(sketches.state_loans), counts_series(sketches.state_defaults))
+    return mark_approximate(result, count_error=max(sketches.state_defaults.error_bound, sketches.state_loans.error_bound))
+
+async def approximate_risk_factors(sketches: LoanSketches):
+    """Correlations computed on the reservoir sample of rows."""
+    sample = sketches.sample
+    result = await analyze_risk_factors_frame(pd.DataFrame(sample.rows))
+    return mark_approximate(
+        result,
+        sample_size=len(sample.rows),
+        population=sample.n,
+        # Standard error of a correlation near zero on a simple random sample
+        correlation_standard_error=1 / math.sqrt(len(sample.rows)) if sample.rows else None,
+    )
+
+async def approximate_temporal_trends(sketches: LoanSketches):
+    """Yearly default counts from the category counter."""
+    sketches.require("earliest_cr_line", "is_bad")
+    yearly_defaults = counts_series(sketches.yearly_defaults).sort_index()
+    if yearly_defaults.empty:
+        raise ValueError("No rows with 'is_bad == True'. The dataset contains no loan defaults.")
+    result = await summarize_temporal_trends(yearly_defaults)
+    return mark_approximate(result, count_error=sketches.yearly_defaults.error_bound)
@@ -1,27 +1,105 @@
-from app.analysis.analysis_functions import (
-    analyze_loan_amount_distribution,
-    grade_vs_defaults,
-    state_wise_defaults,
-    risk_factors_analysis,
-    temporal_default_trends,  
-    generate_final_report,
-)
+import os
+from app.utils.memory import MEMORY_BUDGET_MB, admission, estimate_mb, track_memory, within_budget
+from app.constants.database import TABLE_NAME  # Import TABLE_NAME from constants
+
+# "exact" loads the full table for every analysis; "approximate" builds sketches in one streaming pass
+ANALYTICS_MODE = os.getenv("ANALYTICS_MODE", "exact")
 
 cache = {}
+# True while the cache is being built at startup, so missing entries mean "not ready yet" rather than failed
+cache_state = {"warming": False}
+
+EXACT_ANALYSES = [
+    "loan_distribution",
+    "grade_defaults",
+    "state_defaults",
+    "risk_factors",
+    "temporal_trends",
+]
 
-async def initialize_cache():
+async def initialize_cache(mode: str = ANALYTICS_MODE):
     """
     Precompute and cache results for analyses and the final report.
     """
     global cache
 
     try:
-        # Precompute individual analyses and store them in the cache
-        cache["loan_distribution"] = await analyze_loan_amount_distribution()
-        cache["grade_defaults"] = await grade_vs_defaults()
-        cache["state_defaults"] = await state_wise_defaults()
-        cache["risk_factors"] = await risk_factors_analysis()
-        cache["temporal_trends"] = await temporal_default_trends()
+        # Import the analysis stack (pandas, numpy) only once the cache is actually built
+        from app.analysis.analysis_functions import (
+            analyze_loan_amount_distribution,
+            grade_vs_defaults,
+            state_wise_defaults,
+            risk_factors_analysis,
+            temporal_default_trends,
+            generate_final_report,
+            fill_summaries,
+        )
+        from app.analysis.approximate import (
+            build_loan_sketches,
+            approximate_loan_distribution,
+            approximate_grade_defaults,
+            approximate_state_defaults,
+            approximate_risk_factors,
+            approximate_temporal_trends,
+        )
+
+        from app.services.supabase_client import count_rows
+
+        # Each exact analysis loads the whole table, so fall back to sketches when it would not fit the budget
+        rows = await count_rows(TABLE_NAME) if MEMORY_BUDGET_MB else None
+        stages = [f"analysis.{name}" for name in EXACT_ANALYSES]
+        if mode != "approximate" and rows is not None:
+            needed = estimate_mb(rows, *stages)
+            if not within_budget(needed):
+                print(
+                    f"Exact analyses need ~{needed:.0f} MB for {rows} rows, over the {MEMORY_BUDGET_MB:.0f} MB "
+                    f"memory budget. Falling back to approximate mode."
+                )
+                mode = "approximate"
+
+        results = {}
+        if mode == "approximate":
+            # Stream the table once into mergeable sketches and derive every analysis from them
+            approximations = {
+                "loan_distribution": approximate_loan_distribution,
+                "grade_defaults": approximate_grade_defaults,
+                "state_defaults": approximate_state_defaults,
+                "risk_factors": approximate_risk_factors,
+                "temporal_trends": approximate_temporal_trends,
+            }
+            with track_memory("analysis.approximate"):
+                sketches = await build_loan_sketches()
+                for name in EXACT_ANALYSES:
+                    try:
+                        results[name] = await approximations[name](sketches)
+                    except Exception as e:
+                        print(f"Error computing analysis '{name}': {e}")
+        else:
+            # Precompute individual analyses, queueing behind other heavy work
+            analyses = {
+                "loan_distribution": analyze_loan_amount_distribution,
+                "grade_defaults": grade_vs_defaults,
+                "state_defaults": state_wise_defaults,
+                "risk_factors": risk_factors_analysis,
+                "temporal_trends": temporal_default_trends,
+            }
+            async with admission.reserve(estimate_mb(rows or 0, *stages), "analysis"):
+                for name in EXACT_ANALYSES:
+                    try:
+                        with track_memory(f"analysis.{name}", rows):
+                            results[name] = await analyses[name]()
+                    except Exception as e:
+                        print(f"Error computing analysis '{name}': {e}")
+
+        # Generate the independent analysis summaries as one concurrent batch
+        await fill_summaries(list(results.values()))
+        cache.update(results)
+
+        # The final report combines every analysis, so it needs all of them
+        missing = [name for name in EXACT_ANALYSES if name not in cache]
+        if missing:
+            print(f"Skipping the final report; analyses {missing} are not available.")
+            return
 
         # Generate and cache the final report using precomputed analyses
         cache["final_report"] = await generate_final_report(
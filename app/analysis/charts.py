@@ -0,0 +1,143 @@
+import base64
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Histogram binning: an integer bin count or a NumPy strategy name ("fd" = Freedman-Diaconis)
+HISTOGRAM_BINS = os.getenv("HISTOGRAM_BINS", "fd")
+HISTOGRAM_MAX_BINS = int(os.getenv("HISTOGRAM_MAX_BINS", "200"))
+# Render PNG images while building the cache instead of on first request
+EAGER_CHART_IMAGES = os.getenv("EAGER_CHART_IMAGES", "false").lower() == "true"
+
+def parse_bins(bins):
+    """Accept an integer bin count (possibly as a string) or a NumPy binning strategy name."""
+    if isinstance(bins, str) and bins.isdigit():
+        return int(bins)
+    return bins
+
+def histogram_chart(values, title, x_label, y_label="Frequency", bins=HISTOGRAM_BINS, color="skyblue"):
+    """Bin numeric values with NumPy and return the histogram as a chart spec."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+    if values.size == 0:
+        raise ValueError("Cannot build a histogram from an empty series.")
+
+    edges = np.histogram_bin_edges(values, bins=parse_bins(bins))
+    binning = str(bins)
+    # Adaptive rules can explode on heavy tails, so cap the number of bins
+    if len(edges) - 1 > HISTOGRAM_MAX_BINS:
+        edges = np.histogram_bin_edges(values, bins=HISTOGRAM_MAX_BINS)
+        binning = f"{bins} (capped to {HISTOGRAM_MAX_BINS} equal-width bins)"
+    counts, edges = np.histogram(values, bins=edges)
+
+    return binned_histogram_chart(edges[:-1], edges[1:], counts, title, x_label, y_label, binning, color)
+
+def binned_histogram_chart(bin_start, bin_end, counts, title, x_label, y_label="Frequency", binning="", color="skyblue"):
+    """Return a histogram chart spec from precomputed bins."""
+    return {
+        "type": "histogram",
+        "title": title,
+        "x_label": x_label,
+        "y_label": y_label,
+        "color": color,
+        "binning": binning,
+        "series": {
+            "bin_start": np.asarray(bin_start, dtype=float).tolist(),
+            "bin_end": np.asarray(bin_end, dtype=float).tolist(),
+            "count": np.asarray(counts).tolist(),
+        },
+    }
+
+def category_chart(values, title, x_label, y_label, kind="bar", color="skyblue", **extra_series):
+    """Return a categorical chart spec from a pandas Series indexed by label.
+
+    Additional aligned series (e.g. counts behind a rate) can be passed as keyword arguments.
+    """
+    series = {"label": [str(label) for label in values.index], "value": [float(v) for v in values.to_numpy()]}
+    for name, extra in extra_series.items():
+        series[name] = [float(v) for v in extra.reindex(values.index).fillna(0).to_numpy()]
+    return {
+        "type": kind,
+        "title": title,
+        "x_label": x_label,
+        "y_label": y_label,
+        "color": color,
+        "series": series,
+    }
+
+def line_chart(values, title, x_label, y_label, color="blue"):
+    """Return a line chart spec from a pandas Series indexed by x value."""
+    return {
+        "type": "line",
+        "title": title,
+        "x_label": x_label,
+        "y_label": y_label,
+        "color": color,
+        "series": {
+            "x": [float(x) for x in values.index],
+            "y": [float(y) for y in values.to_numpy()],
+        },
+    }
+
+def render_chart(chart):
+    """Render a chart spec to a base64 PNG data URI with matplotlib."""
+    import matplotlib
+    matplotlib.use("Agg")  # This ensures plots are not rendered visually
+    import matplotlib.pyplot as plt
+
+    series = chart["series"]
+    if chart["type"] == "histogram":
+        widths = np.subtract(series["bin_end"], series["bin_start"])
+        plt.figure(figsize=(10, 6))
+        plt.bar(series["bin_start"], series["count"], width=widths, align="edge", color=chart["color"], edgecolor="black")
+    elif chart["type"] == "bar":
+        plt.figure(figsize=(12, 6) if len(series["label"]) > 10 else (8, 5))
+        plt.bar(series["label"], series["value"], color=chart["color"])
+        plt.xticks(rotation=90)
+    elif chart["type"] == "barh":
+        plt.figure(figsize=(10, 6))
+        plt.barh(series["label"], series["value"], color=chart["color"])
+    elif chart["type"] == "line":
+        plt.figure(figsize=(10, 6))
+        plt.plot(series["x"], series["y"], marker="o", color=chart["color"])
+    else:
+        raise ValueError(f"Unsupported chart type '{chart['type']}'.")
+
+    plt.title(chart["title"])
+    plt.xlabel(chart["x_label"])
+    plt.ylabel(chart["y_label"])
+    plt.tight_layout()
+
+    # Save to base64 image
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")
+    buffer.seek(0)
+    encoded_image = base64.b64encode(buffer.read()).decode("utf-8")
+    buffer.close()
+    plt.close()  # Close the plot to free memory
+
+    return f"data:image/png;base64,{encoded_image}"
+
+# pyplot keeps global figure state, so renders from worker threads must not interleave
+render_lock = threading.Lock()
+
+def with_image(result):
+    """Render and memoize the PNG image of a cached analysis result on first access."""
+    if "image" not in result and "chart" in result:
+        with render_lock:
+            if "image" not in result:
+                result["image"] = render_chart(result["chart"])
+    return result
+
+def chart_to_arrow(chart):
+    """Serialize a chart spec's series to an Arrow IPC stream."""
+    import pyarrow as pa
+
+    metadata = {key: str(value) for key, value in chart.items() if key != "series"}
+    table = pa.table(chart["series"]).replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,198 @@
+import logging
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+from app.analysis.sketches import ReservoirSample
+from app.services.supabase_client import get_data, iter_data, count_rows
+from app.utils.memory import MEMORY_BUDGET_MB, admission, estimate_mb, track_memory, within_budget
+from app.utils.data_normalization import normalize_term, normalize_emp_length, normalize_rate
+from app.constants.database import TABLE_NAME  # Import TABLE_NAME from constants
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Normalized numeric features, as derived in risk_factors_analysis
+FEATURES = [
+    "term",
+    "emp_length",
+    "int_rate",
+    "dti",
+    "annual_inc",
+    "loan_amnt",
+    "funded_amnt",
+    "installment",
+    "revol_bal",
+    "revol_util",
+    "delinq_2yrs",
+    "inq_last_6mths",
+    "open_acc",
+    "pub_rec",
+    "total_acc",
+]
+
+# Trained models keyed by version, plus the version used when none is requested
+registry = {"versions": {}, "active": None, "training": False}
+# Number of model versions kept in memory
+MAX_MODEL_VERSIONS = 5
+# Rows sampled for training when the full table does not fit the memory budget
+TRAINING_SAMPLE_SIZE = 50000
+
+def build_feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Normalize the model features of a DataFrame into a float matrix; missing values are NaN."""
+    columns = []
+    for feature in FEATURES:
+        if feature not in df.columns:
+            columns.append(np.full(len(df), np.nan))
+            continue
+        values = df[feature]
+        if feature in ("term", "emp_length"):
+            # CSV readers infer numeric terms and lengths, but the normalizers parse strings
+            values = values.astype(str).where(values.notnull())
+        if feature == "term":
+            values = values.apply(normalize_term)
+        elif feature == "emp_length":
+            values = values.apply(normalize_emp_length)
+        elif feature == "int_rate":
+            values = normalize_rate(values)
+        columns.append(pd.to_numeric(values, errors="coerce").to_numpy(dtype=float))
+    return np.column_stack(columns)
+
+class LogisticModel:
+    """L2-regularized logistic regression fitted with Newton's method on standardized features."""
+
+    def __init__(self, l2: float = 1.0, max_iter: int = 25, tol: float = 1e-6):
+        self.l2 = l2
+        self.max_iter = max_iter
+        self.tol = tol
+        self.mean = None
+        self.scale = None
+        self.weights = None
+
+    def _design(self, X: np.ndarray) -> np.ndarray:
+        """Standardize features, impute missing values with the training mean and add an intercept."""
+        Z = (X - self.mean) / self.scale
+        Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
+        return np.hstack([np.ones((Z.shape[0], 1)), Z])
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "LogisticModel":
+        with warnings.catch_warnings():
+            # Features absent from the training data are all-NaN; they get mean 0 and scale 1
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.mean = np.nan_to_num(np.nanmean(X, axis=0))
+            self.scale = np.nanstd(X, axis=0)
+        self.scale = np.where(np.nan_to_num(self.scale) > 0, self.scale, 1.0)
+
+        A = self._design(X)
+        penalty = self.l2 * np.eye(A.shape[1])
+        penalty[0, 0] = 0.0  # Do not shrink the intercept
+        w = np.zeros(A.shape[1])
+        for _ in range(self.max_iter):
+            p = 1.0 / (1.0 + np.exp(-(A @ w)))
+            gradient = A.T @ (p - y) + penalty @ w
+            hessian = (A * (p * (1 - p))[:, None]).T @ A + penalty
+            step = np.linalg.solve(hessian, gradient)
+            w -= step
+            if np.max(np.abs(step)) < self.tol:
+                break
+        self.weights = w
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-(self._design(X) @ self.weights)))
+
+def roc_auc(y: np.ndarray, scores: np.ndarray) -> float:
+    """Compute ROC AUC from ranks (Mann-Whitney U)."""
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if positives == 0 or negatives == 0:
+        return float("nan")
+    ranks = pd.Series(scores).rank().to_numpy()
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+def fit_model(df: pd.DataFrame) -> dict:
+    """Fit a model on loan data and return a registry entry (without a version)."""
+    if "is_bad" not in df:
+        raise ValueError("Column 'is_bad' is missing in the dataset.")
+    y = pd.to_numeric(df["is_bad"], errors="coerce").fillna(0).astype(int).to_numpy()
+    if y.min() == y.max():
+        raise ValueError("Training data needs both defaulted and non-defaulted loans.")
+
+    X = build_feature_matrix(df)
+    model = LogisticModel().fit(X, y)
+    return {
+        "model": model,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "rows": int(len(y)),
+        "default_rate": float(y.mean()),
+        "train_auc": roc_auc(y, model.predict_proba(X)),
+        "coefficients": dict(zip(FEATURES, model.weights[1:].tolist())),
+        "intercept": float(model.weights[0]),
+    }
+
+async def train_risk_model():
+    """Train a new model version from the stored loans and make it active."""
+    if registry["training"]:
+        logger.info("Risk model training already in progress; skipping.")
+        return None
+    registry["training"] = True
+    try:
+        rows = await count_rows(TABLE_NAME) if MEMORY_BUDGET_MB else None
+        sampled = rows is not None and not within_budget(estimate_mb(rows, "train_risk_model"))
+        admitted_rows = min(rows, TRAINING_SAMPLE_SIZE) if sampled else (rows or 0)
+
+        async with admission.reserve(estimate_mb(admitted_rows, "train_risk_model"), "train_risk_model"):
+            with track_memory("train_risk_model", admitted_rows):
+                if sampled:
+                    # Train on a uniform sample streamed page by page instead of the whole table
+                    logger.info(f"Training on a {TRAINING_SAMPLE_SIZE}-row sample of {rows} loans to stay within the memory budget.")
+                    sample = ReservoirSample(TRAINING_SAMPLE_SIZE)
+                    async for page in iter_data(TABLE_NAME):
+                        sample.update(page)
+                    data = sample.rows
+                else:
+                    data = await get_data(TABLE_NAME)
+                entry = await run_in_threadpool(fit_model, pd.DataFrame(data))
+        version = max(registry["versions"], default=0) + 1
+        entry["version"] = version
+        registry["versions"][version] = entry
+        registry["active"] = version
+        for old_version in sorted(registry["versions"])[:-MAX_MODEL_VERSIONS]:
+            del registry["versions"][old_version]
+        logger.info(f"Trained risk model version {version} on {entry['rows']} loans (AUC {entry['train_auc']:.3f}).")
+        return version
+    except Exception as e:
+        logger.error(f"Failed to train risk model: {e}")
+        return None
+    finally:
+        registry["training"] = False
+
+def model_info(entry: dict) -> dict:
+    """Describe a registry entry in a JSON-friendly form."""
+    return {key: value for key, value in entry.items() if key != "model"}
+
+def score(df: pd.DataFrame, version: int = None) -> dict:
+    """Score applicants with the requested (or active) model version."""
+    version = version or registry["active"]
+    if version is None:
+        raise KeyError("No risk model has been trained yet.")
+    if version not in registry["versions"]:
+        raise KeyError(f"Risk model version {version} is not available.")
+    model = registry["versions"][version]["model"]
+
+    started = time.perf_counter()
+    probabilities = model.predict_proba(build_feature_matrix(df))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "model_version": version,
+        "rows": int(len(probabilities)),
+        "probabilities": probabilities.round(6).tolist(),
+        "elapsed_ms": round(elapsed_ms, 3),
+        "rows_per_ms": round(len(probabilities) / elapsed_ms, 1) if elapsed_ms > 0 else None,
+    }
@@ -0,0 +1,268 @@
+import hashlib
+import math
+from collections import Counter
+
+import numpy as np
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch.
+
+    Values are kept in a hierarchy of compactors; an item at level h stands for 2**h input
+    values. Results are exact until the first compaction.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: int = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+        self.compactors = [np.empty(0)]
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def update(self, values):
+        """Add a batch of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.n += values.size
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """Merge another sketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if items.size >= self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # Compact an even number of items, keeping every other one from a random offset
+                keep = items[-1:] if items.size % 2 else items[:0]
+                paired = items[: items.size - keep.size]
+                promoted = paired[self.rng.integers(2)::2]
+                self.compactors[level] = keep
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+                # Adding a level lowers every capacity, so start over from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def quantiles(self, fractions) -> np.ndarray:
+        """Estimate the values at the given rank fractions (0-1)."""
+        if self.n == 0:
+            return np.full(len(fractions), np.nan)
+        values = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(items.size, 2.0 ** level) for level, items in enumerate(self.compactors)])
+        order = np.argsort(values)
+        values, cumulative = values[order], np.cumsum(weights[order])
+        ranks = np.asarray(fractions, dtype=float) * cumulative[-1]
+        return values[np.minimum(np.searchsorted(cumulative, ranks, side="left"), values.size - 1)]
+
+    @property
+    def exact(self) -> bool:
+        return len(self.compactors) == 1
+
+    @property
+    def rank_error(self) -> float:
+        """Normalized rank error at ~99% confidence (0 while the sketch is still exact)."""
+        return 0.0 if self.exact else 2.296 / self.k ** 0.9723
+
+class StreamingMoments:
+    """Exact, mergeable count/sum/min/max/variance of a numeric stream."""
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.n += values.size
+        self.total += float(values.sum())
+        self.total_squares += float(np.square(values).sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    def merge(self, other: "StreamingMoments"):
+        self.n += other.n
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else math.nan
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation, matching pandas' describe()."""
+        if self.n < 2:
+            return math.nan
+        variance = (self.total_squares - self.n * self.mean ** 2) / (self.n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+class FixedWidthHistogram:
+    """Mergeable histogram with fixed-width bins aligned to zero; only occupied bins are stored."""
+
+    def __init__(self, width: float):
+        self.width = width
+        self.counts = Counter()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        bins, counts = np.unique(np.floor(values / self.width).astype(np.int64), return_counts=True)
+        self.counts.update(dict(zip(bins.tolist(), counts.tolist())))
+
+    def merge(self, other: "FixedWidthHistogram"):
+        if other.width != self.width:
+            raise ValueError("Cannot merge histograms with different bin widths.")
+        self.counts.update(other.counts)
+
+    def bins(self, max_bins: int = None):
+        """Return (bin_start, bin_end, counts), coalescing adjacent bins to at most `max_bins`."""
+        if not self.counts:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+        low, high = min(self.counts), max(self.counts)
+        dense = np.zeros(high - low + 1, dtype=np.int64)
+        for index, count in self.counts.items():
+            dense[index - low] = count
+        factor = 1 if not max_bins else max(1, math.ceil(dense.size / max_bins))
+        if factor > 1:
+            dense = np.pad(dense, (0, -dense.size % factor)).reshape(-1, factor).sum(axis=1)
+        starts = (low + np.arange(dense.size) * factor) * self.width
+        return starts, starts + factor * self.width, dense
+
+class CategoryCounter:
+    """Mergeable category counter: exact up to `max_exact` keys, then a count-min sketch.
+
+    Once the sketch takes over, counts may be overestimated by at most `error_bound` with
+    probability 1 - e**-depth, and only the first `max_keys` distinct keys remain reportable.
+    """
+
+    def __init__(self, max_exact: int = 1000, width: int = 2048, depth: int = 4, max_keys: int = 10000):
+        self.max_exact = max_exact
+        self.max_keys = max_keys
+        self.width = width
+        self.depth = depth
+        self.n = 0
+        self.exact_counts = Counter()
+        self.table = None
+        self.keys = set()
+
+    def _hashes(self, key) -> list:
+        # Derive one column per row from two independent 64-bit hashes (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def _switch_to_sketch(self):
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.keys = set(self.exact_counts)
+        for key, count in self.exact_counts.items():
+            self._add(key, count)
+        self.exact_counts = Counter()
+
+    def _add(self, key, count: int):
+        if len(self.keys) < self.max_keys:
+            self.keys.add(key)
+        for row, column in enumerate(self._hashes(key)):
+            self.table[row, column] += count
+
+    def update(self, keys):
+        counts = Counter(keys)
+        self.n += sum(counts.values())
+        if self.table is None:
+            self.exact_counts.update(counts)
+            if len(self.exact_counts) > self.max_exact:
+                self._switch_to_sketch()
+            return
+        for key, count in counts.items():
+            self._add(key, count)
+
+    def merge(self, other: "CategoryCounter"):
+        if self.table is None and other.table is None:
+            self.n += other.n
+            self.exact_counts.update(other.exact_counts)
+            if len(self.exact_counts) > self.max_exact:
+                self._switch_to_sketch()
+            return
+        if self.table is None:
+            self._switch_to_sketch()
+        if other.table is None:
+            for key, count in other.exact_counts.items():
+                self._add(key, count)
+        else:
+            self.table += other.table
+            self.keys |= set(list(other.keys)[: max(0, self.max_keys - len(self.keys))])
+        self.n += other.n
+
+    def counts(self) -> dict:
+        """Return (estimated) counts per known key."""
+        if self.table is None:
+            return dict(self.exact_counts)
+        return {key: int(min(self.table[row, column] for row, column in enumerate(self._hashes(key)))) for key in self.keys}
+
+    @property
+    def exact(self) -> bool:
+        return self.table is None
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overcount per key (0 while counts are exact)."""
+        return 0.0 if self.exact else math.e / self.width * self.n
+
+class ReservoirSample:
+    """Uniform, mergeable reservoir sample of rows (Algorithm R with the draws vectorized per batch)."""
+
+    def __init__(self, size: int = 10000, seed: int = None):
+        self.size = size
+        self.n = 0
+        self.rows = []
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, rows: list):
+        # Fill the reservoir first
+        free = max(0, min(self.size - len(self.rows), len(rows)))
+        self.rows.extend(rows[:free])
+        self.n += free
+        rest = rows[free:]
+        if not rest:
+            return
+        # Row i of the batch is the (n + i + 1)-th row seen and replaces a uniform slot below that count;
+        # only draws landing inside the reservoir need Python work, and later rows overwrite earlier ones
+        slots = self.rng.integers(np.arange(self.n + 1, self.n + len(rest) + 1))
+        for index in np.flatnonzero(slots < self.size):
+            self.rows[slots[index]] = rest[index]
+        self.n += len(rest)
+
+    def merge(self, other: "ReservoirSample"):
+        """Merge two samples, drawing from each in proportion to the rows it has seen."""
+        total = self.n + other.n
+        if total == 0:
+            return
+        take = min(self.size, len(self.rows) + len(other.rows))
+        from_other = self.rng.hypergeometric(other.n, self.n, take) if self.n and other.n else (take if other.n else 0)
+        from_other = min(from_other, len(other.rows))
+        from_self = min(take - from_other, len(self.rows))
+        mine = [self.rows[i] for i in self.rng.choice(len(self.rows), from_self, replace=False)] if from_self else []
+        theirs = [other.rows[i] for i in self.rng.choice(len(other.rows), from_other, replace=False)] if from_other else []
+        self.rows = mine + theirs
+        self.n = total
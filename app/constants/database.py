@@ -1 +1,8 @@
-TABLE_NAME = "lending_club_loans"
\ No newline at end of file
+TABLE_NAME = "lending_club_loans"
+
+# Row identity used for upserts: a hash of KEY_COLUMNS (the loan URL carries the loan id),
+# falling back to the content hash when every key column is empty
+KEY_COLUMN = "loan_key"
+KEY_COLUMNS = ["url"]
+# Content hash of the row, used to skip unchanged rows on re-upload
+HASH_COLUMN = "row_hash"
\ No newline at end of file
@@ -1,16 +1,46 @@
-from fastapi import FastAPI
+from app import config  # Load .env (and check Supabase settings) before modules read their settings
+from app.utils import startup_profiler
+startup_profiler.install()  # Time every import that follows (when STARTUP_PROFILE=true)
+
+import asyncio
+import importlib
+import sys
+from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
-from app.routes import data_analysis, data_processing
-from app.analysis.cache import initialize_cache
+from app.routes import data_analysis, data_processing, data_export, risk_scoring, metrics
+from app.analysis.cache import cache_state, initialize_cache
+
+async def warm_up():
+    """Build the analysis cache and train the risk model after the server starts accepting requests."""
+    try:
+        with startup_profiler.phase("import_analysis_stack"):
+            # Load pandas/numpy in a worker thread so the event loop keeps serving requests
+            await asyncio.to_thread(importlib.import_module, "app.analysis.analysis_functions")
+        print("Initializing cache...")
+        with startup_profiler.phase("initialize_cache"):
+            await initialize_cache()  # Precompute results and store them in cache
+        print("Cache initialized.")
+    finally:
+        cache_state["warming"] = False
+    from app.analysis.risk_model import train_risk_model
+    with startup_profiler.phase("train_risk_model"):
+        await train_risk_model()
+    if startup_profiler.STARTUP_PROFILE:
+        startup_profiler.log_report()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan handler to initialize and clean up resources."""
-    print("Initializing cache...")
-    await initialize_cache()  # Precompute results and store them in cache
-    print("Cache initialized.")
+    cache_state["warming"] = True  # Analysis endpoints answer 503 until warm-up finishes
+    warming = asyncio.create_task(warm_up())  # Warm caches without delaying the first response
+    if startup_profiler.STARTUP_PROFILE:
+        startup_profiler.log_report()
     yield  # This allows the application to run
     print("Shutting down resources (if necessary)...")
+    warming.cancel()
+    llm_gateway = sys.modules.get("app.services.llm_gateway")
+    if llm_gateway is not None:
+        await llm_gateway.gateway.aclose()  # Release pooled LLM connections
 
 # Create FastAPI application with lifespan
 app = FastAPI(lifespan=lifespan)
@@ -18,7 +48,22 @@ app = FastAPI(lifespan=lifespan)
 # Mount routers
 app.include_router(data_processing.router, prefix="/api/data-processing", tags=["Data Processing"])
 app.include_router(data_analysis.router, prefix="/api/data_analysis", tags=["Data Analysis"])
+app.include_router(data_export.router, prefix="/api/data-export", tags=["Data Export"])
+app.include_router(risk_scoring.router, prefix="/api/risk-scoring", tags=["Risk Scoring"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+
+if startup_profiler.STARTUP_PROFILE:
+    @app.middleware("http")
+    async def record_first_response(request: Request, call_next):
+        response = await call_next(request)
+        startup_profiler.mark_first_response()
+        return response
+
+    @app.get("/startup-profile")
+    def startup_profile():
+        """Import, lifespan phase and time-to-first-response timings for this process."""
+        return startup_profiler.report()
 
 @app.get("/")
 def read_root():
-    return {"message": "Backend is running"}
+    return {"message": "Backend is running"}
\ No newline at end of file
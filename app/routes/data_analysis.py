@@ -1,47 +1,98 @@
 # app/routes/data_analysis.py
-from fastapi import APIRouter, HTTPException
-from app.analysis.cache import cache
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from app.analysis.cache import cache, cache_state
 
 router = APIRouter()
 
+# Seconds clients are asked to wait before retrying while the cache warms up
+CACHE_WARMING_RETRY_AFTER = 10
+
+def cache_unavailable(detail: str) -> HTTPException:
+    """503 with Retry-After while the cache is warming up, otherwise a 500 for a failed analysis."""
+    if cache_state["warming"]:
+        return HTTPException(
+            status_code=503,
+            detail="The analysis cache is still warming up.",
+            headers={"Retry-After": str(CACHE_WARMING_RETRY_AFTER)},
+        )
+    return HTTPException(status_code=500, detail=detail)
+
+def render_image(result):
+    """Render the cached result's PNG, importing the chart stack only then."""
+    from app.analysis.charts import with_image as render_with_image
+    return render_with_image(result)
+
+async def with_image(result):
+    """Attach the cached result's PNG, rendering it in a worker thread on first access."""
+    if "image" in result or "chart" not in result:
+        return result
+    return await run_in_threadpool(render_image, result)
+
+# Chart names exposed under /charts, mapped to their cache keys
+CHART_CACHE_KEYS = {
+    "loan-distribution": "loan_distribution",
+    "grade-defaults": "grade_defaults",
+    "state-defaults": "state_defaults",
+    "risk-factors": "risk_factors",
+    "temporal-trends": "temporal_trends",
+    "report": "final_report",
+}
+
 @router.get("/loan-distribution")
 async def loan_distribution():
     """Fetch precomputed loan distribution analysis from the cache."""
     if "loan_distribution" in cache:
-        return cache["loan_distribution"]
-    raise HTTPException(status_code=500, detail="Loan distribution data is not available in the cache.")
+        return await with_image(cache["loan_distribution"])
+    raise cache_unavailable("Loan distribution data is not available in the cache.")
 
 @router.get("/grade-defaults")
 async def grade_defaults():
     """Fetch precomputed grade defaults analysis from the cache."""
     if "grade_defaults" in cache:
-        return cache["grade_defaults"]
-    raise HTTPException(status_code=500, detail="Grade defaults data is not available in the cache.")
+        return await with_image(cache["grade_defaults"])
+    raise cache_unavailable("Grade defaults data is not available in the cache.")
 
 @router.get("/state-defaults")
 async def state_defaults():
     """Fetch precomputed state defaults analysis from the cache."""
     if "state_defaults" in cache:
-        return cache["state_defaults"]
-    raise HTTPException(status_code=500, detail="State defaults data is not available in the cache.")
+        return await with_image(cache["state_defaults"])
+    raise cache_unavailable("State defaults data is not available in the cache.")
 
 @router.get("/risk-factors")
 async def risk_factors():
     """Fetch precomputed risk factors analysis from the cache."""
     if "risk_factors" in cache:
-        return cache["risk_factors"]
-    raise HTTPException(status_code=500, detail="Risk factors data is not available in the cache.")
+        return await with_image(cache["risk_factors"])
+    raise cache_unavailable("Risk factors data is not available in the cache.")
 
 @router.get("/temporal-trends")
 async def temporal_trends():
     """Fetch precomputed temporal trends analysis from the cache."""
     if "temporal_trends" in cache:
-        return cache["temporal_trends"]
-    raise HTTPException(status_code=500, detail="Temporal trends data is not available in the cache.")
+        return await with_image(cache["temporal_trends"])
+    raise cache_unavailable("Temporal trends data is not available in the cache.")
 
 @router.get("/report")
 async def report():
     """Fetch the precomputed final analysis report from the cache."""
     if "final_report" in cache:
-        return cache["final_report"]
-    raise HTTPException(status_code=500, detail="Final report is not available in the cache.")
+        return await with_image(cache["final_report"])
+    raise cache_unavailable("Final report is not available in the cache.")
+
+@router.get("/charts/{name}")
+async def chart_data(name: str, format: str = "json"):
+    """Fetch the numeric series behind a chart as JSON or an Arrow IPC stream."""
+    if name not in CHART_CACHE_KEYS:
+        raise HTTPException(status_code=404, detail=f"Unknown chart '{name}'.")
+    result = cache.get(CHART_CACHE_KEYS[name])
+    if not result or "chart" not in result:
+        raise cache_unavailable(f"Chart data for '{name}' is not available in the cache.")
+
+    if format == "json":
+        return result["chart"]
+    if format == "arrow":
+        from app.analysis.charts import chart_to_arrow
+        return Response(content=chart_to_arrow(result["chart"]), media_type="application/vnd.apache.arrow.stream")
+    raise HTTPException(status_code=400, detail="Unsupported format. Use 'json' or 'arrow'.")
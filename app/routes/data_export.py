@@ -0,0 +1,107 @@
+from typing import Optional
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import logging
+from app.constants.database import TABLE_NAME, KEY_COLUMN, HASH_COLUMN  # Import table constants
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Query parameters handled by the export itself rather than passed to PostgREST as filters
+RESERVED_PARAMS = {"format", "columns", "page_size", "select", "order", "offset", "limit"}
+
+def export_columns(columns: Optional[str], schema: dict) -> list:
+    """Validate a comma-separated column list against the table schema (all columns by default)."""
+    known = [KEY_COLUMN, *schema, HASH_COLUMN]
+    if not columns:
+        return known
+    requested = [column.strip() for column in columns.split(",") if column.strip()]
+    unknown = [column for column in requested if column not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {unknown}")
+    return list(dict.fromkeys(requested))
+
+async def drop_key(pages, key_column: str):
+    """Remove the pagination key from rows when it was not requested."""
+    async for page in pages:
+        for row in page:
+            row.pop(key_column, None)
+        yield page
+
+async def prepend(first, pages):
+    """Yield an already fetched first page followed by the remaining pages."""
+    yield first
+    async for page in pages:
+        yield page
+
+async def chain(*page_streams):
+    """Yield the pages of each stream in turn."""
+    for pages in page_streams:
+        async for page in pages:
+            yield page
+
+@router.get("/loans")
+async def export_loans(
+    request: Request,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    page_size: int = Query(1000, ge=1, le=10000),
+):
+    """Stream filtered loans as CSV, NDJSON or Parquet.
+
+    Any other query parameter is passed to PostgREST as a filter, e.g. `grade=eq.A&loan_amnt=gte.10000`.
+    """
+    from app.routes.data_processing import TABLE_SCHEMA
+    from app.services.export import EXPORT_FORMATS, stream_csv, stream_ndjson, stream_parquet
+    from app.services.supabase_client import iter_data
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of {list(EXPORT_FORMATS)}.")
+    selected = export_columns(columns, TABLE_SCHEMA)
+
+    # Keyset pagination needs the key in every row, even when it is not exported
+    fetched = selected if KEY_COLUMN in selected else [KEY_COLUMN, *selected]
+    filters = [(name, value) for name, value in request.query_params.multi_items() if name not in RESERVED_PARAMS]
+    query = urlencode([("select", ",".join(fetched)), *filters], safe=",.()*")
+    # Keyed rows are paged by key; rows loaded before the key column existed (NULL key) follow with
+    # offset pagination, which is only stable while the table is not being written to
+    pages = chain(
+        iter_data(TABLE_NAME, query, page_size, key_column=KEY_COLUMN),
+        iter_data(TABLE_NAME, f"{query}&{KEY_COLUMN}=is.null", page_size),
+    )
+
+    # Fetch the first page before streaming so upstream errors still produce an error status
+    try:
+        first_page = await anext(pages)
+    except StopAsyncIteration:
+        first_page = []
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Export query failed: {e.response.text}")
+        raise HTTPException(status_code=400 if e.response.status_code == 400 else 502, detail=e.response.text)
+    except httpx.HTTPError as e:
+        logger.error(f"Export query failed: {e}")
+        raise HTTPException(status_code=502, detail="Failed to fetch data from Supabase.")
+
+    pages = prepend(first_page, pages)
+    if KEY_COLUMN not in selected:
+        pages = drop_key(pages, KEY_COLUMN)
+
+    if format == "csv":
+        body = stream_csv(pages, selected)
+    elif format == "ndjson":
+        body = stream_ndjson(pages)
+    else:
+        body = stream_parquet(pages, TABLE_SCHEMA, selected)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{TABLE_NAME}.{extension}"'},
+    )
@@ -1,10 +1,8 @@
 from fastapi import APIRouter, HTTPException, UploadFile
-from app.services.supabase_client import insert_data
-import pandas as pd
-from io import StringIO
-import simplejson as json  # Use simplejson for better NaN handling
+from fastapi.concurrency import run_in_threadpool
 import logging
-from app.constants.database import TABLE_NAME  # Import TABLE_NAME from constants
+from app.utils.memory import MB, admission, track_memory
+from app.constants.database import TABLE_NAME, KEY_COLUMN, HASH_COLUMN  # Import table constants
 
 # Initialize logger
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +10,10 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Peak memory of an upload as a multiple of its file size (compressed formats expand more)
+UPLOAD_MEMORY_FACTOR = 3
+COMPRESSED_UPLOAD_MEMORY_FACTOR = 10
+
 TABLE_SCHEMA = {
     "loan_amnt": float,
     "funded_amnt": float,
@@ -49,70 +51,74 @@ TABLE_SCHEMA = {
     "is_bad": bool,
 }
 
-def preprocess_data(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
-    """Preprocess the DataFrame to match the table schema."""
-    for column, dtype in schema.items():
-        if column in df.columns:
-            try:
-                if column == "int_rate":  # Handle percentage strings
-                    df[column] = df[column].str.rstrip('%').astype(float) / 100
-                elif dtype == bool:
-                    df[column] = df[column].apply(lambda x: bool(int(x)) if pd.notnull(x) else False)
-                elif dtype == int:
-                    df[column] = df[column].fillna(0).astype(int)
-                elif dtype == float:
-                    df[column] = df[column].fillna(0.0).astype(float)
-                else:
-                    df[column] = df[column].fillna('').astype(str)
-            except Exception as e:
-                logger.error(f"Error converting column '{column}' to {dtype}: {e}")
-                raise ValueError(f"Column '{column}' contains invalid data for type {dtype}.")
-        else:
-            logger.warning(f"Column '{column}' is missing. Filling with default values.")
-            if dtype == bool:
-                df[column] = False
-            elif dtype == int:
-                df[column] = 0
-            elif dtype == float:
-                df[column] = 0.0
-            else:
-                df[column] = ''
-    return df
-
 @router.post("/upload")
 async def upload_file(file: UploadFile):
-    """Upload CSV file and insert data into Supabase."""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are supported.")
+    """Upload a CSV, gzip CSV, Parquet or NDJSON file and insert data into Supabase."""
+    # Import the Arrow ingest stack and Supabase client on first upload
+    from app.services.ingest import SUPPORTED_FORMATS, detect_format, read_upload, conform_to_schema, add_row_hashes
+    from app.services.supabase_client import insert_data, get_row_hashes
+
+    if detect_format(file.filename) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Supported extensions: {', '.join(SUPPORTED_FORMATS)}.",
+        )
+
+    file_format, compressed = detect_format(file.filename)
+    factor = COMPRESSED_UPLOAD_MEMORY_FACTOR if compressed or file_format == "parquet" else UPLOAD_MEMORY_FACTOR
+    estimate = (file.size or 0) * factor / MB
 
     try:
         logger.info("Started processing file upload...")
 
-        # Read the CSV file into a DataFrame
-        content = await file.read()
-        df = pd.read_csv(StringIO(content.decode('utf-8')))
-        logger.info(f"DataFrame loaded with {len(df)} rows and {len(df.columns)} columns.")
+        # Queue behind other memory-heavy work until the upload fits the memory budget
+        async with admission.reserve(estimate, "ingest"):
+            # Parse the upload stream with Arrow's multithreaded readers off the event loop
+            with track_memory("ingest.parse"):
+                table = await run_in_threadpool(read_upload, file.file, file.filename, TABLE_SCHEMA)
+            logger.info(f"Table loaded with {table.num_rows} rows and {table.num_columns} columns ({table.nbytes / MB:.1f} MB).")
+
+            # Cast columns to the table schema
+            with track_memory("ingest.conform", table.num_rows):
+                table = await run_in_threadpool(conform_to_schema, table, TABLE_SCHEMA)
+            logger.info("Table preprocessed successfully.")
 
-        # Preprocess the DataFrame
-        df = preprocess_data(df, TABLE_SCHEMA)
-        logger.info("DataFrame preprocessed successfully.")
+            # Hash row contents and keys so unchanged rows can be skipped
+            with track_memory("ingest.hash", table.num_rows):
+                table, duplicates = await run_in_threadpool(add_row_hashes, table, TABLE_SCHEMA)
+            logger.info(f"Hashed rows; dropped {duplicates} duplicate keys within the file.")
 
-        # Convert DataFrame to JSON
-        rows = json.loads(df.to_json(orient="records", default_handler=str))
-        logger.info(f"Converted DataFrame to {len(rows)} JSON rows.")
+            # Upsert only new or changed rows into Supabase in batches
+            BATCH_SIZE = 100
+            inserted, updated, skipped = 0, 0, duplicates
+            with track_memory("ingest.upsert", table.num_rows):
+                for i, record_batch in enumerate(table.to_batches(max_chunksize=BATCH_SIZE)):
+                    keys = record_batch.column(KEY_COLUMN).to_pylist()
+                    stored_hashes = await get_row_hashes(TABLE_NAME, KEY_COLUMN, HASH_COLUMN, keys)
 
-        # Insert data into Supabase in batches
-        BATCH_SIZE = 100
-        for i in range(0, len(rows), BATCH_SIZE):
-            batch = rows[i:i + BATCH_SIZE]
-            logger.info(f"Inserting batch {i // BATCH_SIZE + 1} with {len(batch)} records.")
-            await insert_data(TABLE_NAME, batch)
+                    batch = []
+                    for row in record_batch.to_pylist():
+                        stored_hash = stored_hashes.get(row[KEY_COLUMN])
+                        if stored_hash is None:
+                            inserted += 1
+                        elif stored_hash != row[HASH_COLUMN]:
+                            updated += 1
+                        else:
+                            skipped += 1
+                            continue
+                        batch.append(row)
 
-        logger.info("Data uploaded successfully.")
-        return {"message": "Data uploaded successfully"}
+                    if batch:
+                        logger.info(f"Upserting batch {i + 1} with {len(batch)} records.")
+                        await insert_data(TABLE_NAME, batch, on_conflict=KEY_COLUMN)
+
+        logger.info(f"Data uploaded successfully: {inserted} inserted, {updated} updated, {skipped} skipped.")
+        return {
+            "message": "Data uploaded successfully",
+            "inserted": inserted,
+            "updated": updated,
+            "skipped": skipped,
+        }
     except Exception as e:
         logger.error(f"Failed to upload data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to upload data: {str(e)}")
-
-
-
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.utils.memory import memory_report
+
+router = APIRouter()
+
+@router.get("/memory")
+async def memory():
+    """Current memory usage, budget state and per-stage memory peaks."""
+    return memory_report()
@@ -0,0 +1,63 @@
+from io import BytesIO
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+router = APIRouter()
+
+async def parse_applicants(request: Request):
+    """Parse applicants from a CSV body or a JSON list (optionally wrapped in {"applicants": [...]})."""
+    import pandas as pd
+
+    content_type = request.headers.get("content-type", "")
+    body = await request.body()
+    if "text/csv" in content_type:
+        try:
+            return await run_in_threadpool(pd.read_csv, BytesIO(body), engine="pyarrow")
+        except ValueError as e:  # Empty or malformed CSV (pandas and Arrow parse errors are ValueErrors)
+            raise HTTPException(status_code=400, detail=f"Invalid CSV body: {e}")
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be JSON or CSV (Content-Type: text/csv).")
+    if isinstance(payload, dict):
+        payload = payload.get("applicants")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a list of applicants.")
+    return pd.DataFrame.from_records(payload)
+
+@router.post("/score")
+async def score_applicants(request: Request, version: Optional[int] = None):
+    """Score a batch of loan applicants and return their default probabilities."""
+    from app.analysis.risk_model import score
+
+    df = await parse_applicants(request)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="No applicants to score.")
+    try:
+        return await run_in_threadpool(score, df, version)
+    except KeyError as e:
+        raise HTTPException(status_code=503 if version is None else 404, detail=str(e.args[0]))
+
+@router.get("/model")
+async def model():
+    """Describe the active risk model and the versions held in memory."""
+    from app.analysis.risk_model import registry, model_info
+
+    return {
+        "active": registry["active"],
+        "training": registry["training"],
+        "versions": [model_info(entry) for entry in registry["versions"].values()],
+    }
+
+@router.post("/model/train", status_code=202)
+async def train(background_tasks: BackgroundTasks):
+    """Retrain the risk model from the stored loans in the background."""
+    from app.analysis.risk_model import registry, train_risk_model
+
+    if registry["training"]:
+        raise HTTPException(status_code=409, detail="Risk model training is already in progress.")
+    background_tasks.add_task(train_risk_model)
+    return {"message": "Risk model training started."}
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+# Export formats mapped to their media types and file extensions
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Rows buffered into each Parquet row group
+PARQUET_ROW_GROUP_SIZE = 10000
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back written bytes in chunks while keeping absolute offsets."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def stream_ndjson(pages):
+    """Yield one JSON object per line for each page of rows."""
+    async for page in pages:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in page).encode("utf-8")
+
+async def stream_csv(pages, columns: list = None):
+    """Yield CSV text page by page; the header comes from `columns` or the first page."""
+    writer = None
+    buffer = io.StringIO()
+    async for page in pages:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=columns or list(page[0]), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows(page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+async def stream_parquet(pages, schema: dict, columns: list):
+    """Yield a Parquet file incrementally, one row group per PARQUET_ROW_GROUP_SIZE rows.
+
+    `schema` maps column names to Python types (as in TABLE_SCHEMA); other columns are strings.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from app.services.ingest import ARROW_TYPES
+
+    arrow_schema = pa.schema([(column, ARROW_TYPES.get(schema.get(column), pa.string())) for column in columns])
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, arrow_schema)
+    pending = []
+
+    def write_group():
+        writer.write_table(pa.Table.from_pylist(pending, schema=arrow_schema))
+        pending.clear()
+
+    try:
+        async for page in pages:
+            pending.extend(page)
+            if len(pending) >= PARQUET_ROW_GROUP_SIZE:
+                write_group()
+                yield sink.drain()
+        if pending:
+            write_group()
+    finally:
+        writer.close()
+    yield sink.drain()
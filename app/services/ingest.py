@@ -0,0 +1,143 @@
+import hashlib
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+
+from app.constants.database import KEY_COLUMN, KEY_COLUMNS, HASH_COLUMN
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upload formats keyed by filename suffix
+SUPPORTED_FORMATS = {
+    ".csv": "csv",
+    ".csv.gz": "csv",
+    ".parquet": "parquet",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".ndjson.gz": "ndjson",
+    ".jsonl.gz": "ndjson",
+}
+
+# Python types used in table schemas mapped to their Arrow equivalents
+ARROW_TYPES = {
+    float: pa.float64(),
+    int: pa.int64(),
+    str: pa.string(),
+    bool: pa.bool_(),
+}
+
+ARROW_DEFAULTS = {
+    float: 0.0,
+    int: 0,
+    str: "",
+    bool: False,
+}
+
+def detect_format(filename: str):
+    """Return the upload format for a filename, or None if it is not supported."""
+    name = (filename or "").lower()
+    # Check longer suffixes first so ".csv.gz" is not mistaken for something else
+    for suffix in sorted(SUPPORTED_FORMATS, key=len, reverse=True):
+        if name.endswith(suffix):
+            return SUPPORTED_FORMATS[suffix], name.endswith(".gz")
+    return None
+
+def read_upload(source, filename: str, schema: dict) -> pa.Table:
+    """Read an uploaded file object into an Arrow table using Arrow's multithreaded readers.
+
+    `source` is a binary file-like object (e.g. `UploadFile.file`); it is streamed, not decoded
+    into a Python string. String columns from `schema` are read as strings so values such as zip
+    codes are not inferred as numbers.
+    """
+    detected = detect_format(filename)
+    if detected is None:
+        raise ValueError(f"Unsupported file type: {filename}")
+    file_format, compressed = detected
+
+    if file_format == "parquet":
+        return pq.read_table(source, use_threads=True)
+
+    stream = pa.input_stream(source, compression="gzip" if compressed else None)
+    if file_format == "csv":
+        return pacsv.read_csv(
+            stream,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            # Free-text columns such as "desc" may contain quoted newlines
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                strings_can_be_null=True,
+                column_types={column: pa.string() for column, dtype in schema.items() if dtype == str},
+            ),
+        )
+    return pajson.read_json(stream, read_options=pajson.ReadOptions(use_threads=True))
+
+def conform_to_schema(table: pa.Table, schema: dict) -> pa.Table:
+    """Cast and fill the columns of an Arrow table to match the table schema."""
+    for column, dtype in schema.items():
+        arrow_type = ARROW_TYPES[dtype]
+        if column not in table.column_names:
+            logger.warning(f"Column '{column}' is missing. Filling with default values.")
+            table = table.append_column(
+                pa.field(column, arrow_type),
+                pa.repeat(pa.scalar(ARROW_DEFAULTS[dtype], arrow_type), table.num_rows),
+            )
+            continue
+
+        values = table.column(column)
+        if pa.types.is_large_string(values.type) or pa.types.is_string_view(values.type):
+            values = pc.cast(values, pa.string())
+        elif pa.types.is_floating(values.type):
+            # Treat NaN as missing, like fillna() did, so it is filled instead of cast
+            values = pc.if_else(pc.is_nan(values), pa.scalar(None, values.type), values)
+        try:
+            if column == "int_rate" and pa.types.is_string(values.type):  # Handle percentage strings
+                values = pc.utf8_rtrim(pc.utf8_trim_whitespace(values), characters="%")
+                values = pc.divide(pc.cast(values, pa.float64()), 100)
+            elif dtype == int:
+                # Truncate fractional values the same way astype(int) does
+                values = pc.cast(values, arrow_type, safe=False).fill_null(ARROW_DEFAULTS[dtype])
+            else:
+                values = pc.cast(values, arrow_type).fill_null(ARROW_DEFAULTS[dtype])
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.error(f"Error converting column '{column}' to {dtype}: {e}")
+            raise ValueError(f"Column '{column}' contains invalid data for type {dtype}.")
+
+        table = table.set_column(table.column_names.index(column), column, values)
+    return table
+
+def hash_frame(df: pd.DataFrame) -> pd.Series:
+    """Hash each row of a DataFrame to a 16-character hex digest."""
+    return pd.util.hash_pandas_object(df, index=False).map("{:016x}".format)
+
+def hash_keys(keys: pd.DataFrame) -> pd.Series:
+    """Hash key columns the way SQL can reproduce: left(md5(concat_ws('|', <key columns>)), 16)."""
+    joined = keys.iloc[:, 0].str.cat(keys.iloc[:, 1:], sep="|") if keys.shape[1] > 1 else keys.iloc[:, 0]
+    return joined.map(lambda value: hashlib.md5(value.encode("utf-8")).hexdigest()[:16])
+
+def add_row_hashes(table: pa.Table, schema: dict, key_columns: list = KEY_COLUMNS):
+    """Append the content hash and row key columns, dropping rows whose key repeats in the upload.
+
+    The content hash covers every schema column in schema order, taken from the conformed Arrow
+    columns, so it only changes when the stored values change (not with the upload format).
+    Returns the table and the number of in-file duplicates dropped (the last occurrence of a key wins).
+    """
+    # Drop the pandas metadata of pandas-written Parquet files, which would restore the original dtypes
+    df = table.select(list(schema)).replace_schema_metadata(None).to_pandas()
+    row_hash = hash_frame(df)
+    keys = df[key_columns].astype(str)
+    row_key = hash_keys(keys).where((keys != "").any(axis=1), row_hash)
+
+    keep = ~row_key.duplicated(keep="last")
+    table = table.append_column(HASH_COLUMN, pa.array(row_hash.to_numpy(), pa.string()))
+    table = table.append_column(KEY_COLUMN, pa.array(row_key.to_numpy(), pa.string()))
+    duplicates = int((~keep).sum())
+    if duplicates:
+        table = table.filter(pa.array(keep.to_numpy()))
+    return table, duplicates
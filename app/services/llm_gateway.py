@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+import httpx
+
+from app import config  # noqa: F401 -- load .env before the settings below are read
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Point this at a local mock server to exercise the gateway without hitting OpenAI
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# Gateway limits (override through environment variables)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token-bucket limiter refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and consume them."""
+        # Never ask for more than the bucket can hold, otherwise we would wait forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LLMGateway:
+    """Shared, rate-limited client for the OpenAI chat completions API."""
+
+    def __init__(
+        self,
+        api_key: str = OPENAI_API_KEY,
+        base_url: str = OPENAI_BASE_URL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        deadline: float = LLM_DEADLINE_SECONDS,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create the pooled HTTP client so connections are reused across calls."""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=httpx.Timeout(self.deadline, connect=10.0),
+            )
+        return self.client
+
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+        self.client = None
+
+    @staticmethod
+    def estimate_tokens(payload: dict) -> int:
+        """Roughly estimate tokens used by a request (~4 characters per token plus completion)."""
+        characters = sum(len(message["content"]) for message in payload["messages"])
+        return characters // 4 + payload.get("max_tokens", 0)
+
+    async def _post_with_retry(self, payload: dict) -> dict:
+        """Send a chat completion request, retrying 429/5xx and transport errors with jittered backoff."""
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(self.estimate_tokens(payload))
+            try:
+                async with self.semaphore:
+                    response = await client.post("/chat/completions", json=payload)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"LLM transport error ({e}), retrying (attempt {attempt + 1}).")
+                delay = None
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning(f"LLM returned {response.status_code}, retrying (attempt {attempt + 1}).")
+                retry_after = response.headers.get("retry-after")
+                delay = float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None
+
+            # Full-jitter exponential backoff unless the server told us how long to wait
+            if delay is None:
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+            await asyncio.sleep(delay)
+
+    async def chat(self, messages: list, model: str = "gpt-3.5-turbo", max_tokens: int = 150, deadline: float = None) -> str:
+        """Run a single chat completion and return the stripped message content."""
+        if not self.api_key:
+            raise ValueError("OpenAI API key is missing. Please set the OPENAI_API_KEY environment variable.")
+
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens}
+        try:
+            result = await asyncio.wait_for(self._post_with_retry(payload), timeout=deadline or self.deadline)
+        except asyncio.TimeoutError:
+            raise ValueError(f"LLM request exceeded deadline of {deadline or self.deadline} seconds.")
+        return result["choices"][0]["message"]["content"].strip()
+
+    async def chat_many(self, batch: list, **kwargs) -> list:
+        """Run several chat completions concurrently, bounded by the gateway limits.
+
+        Results are returned in input order; failures are returned as exceptions.
+        """
+        return await asyncio.gather(*(self.chat(messages, **kwargs) for messages in batch), return_exceptions=True)
+
+
+gateway = LLMGateway()
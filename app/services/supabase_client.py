@@ -1,6 +1,6 @@
 import httpx
 import logging
-import pandas as pd  # Ensure pandas is imported
+import math
 
 from app.config import SUPABASE_URL, SUPABASE_API_KEY
 
@@ -14,8 +14,11 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
-async def insert_data(table_name, rows):
-    """Insert data into a Supabase table."""
+async def insert_data(table_name, rows, on_conflict=None):
+    """Insert data into a Supabase table.
+
+    When `on_conflict` names a unique column, rows that already exist are updated instead (upsert).
+    """
     if not SUPABASE_URL or not SUPABASE_API_KEY:
         logger.error("Supabase URL or API key is missing.")
         raise ValueError("Supabase URL or API key is missing in environment variables.")
@@ -35,11 +38,16 @@ async def insert_data(table_name, rows):
         "Authorization": f"Bearer {SUPABASE_API_KEY}",
         "Content-Type": "application/json",
     }
+    params = {}
+    if on_conflict:
+        headers["Prefer"] = "resolution=merge-duplicates"
+        params["on_conflict"] = on_conflict
 
     async with httpx.AsyncClient() as client:
         response = await client.post(
             f"{SUPABASE_URL}/rest/v1/{table_name}",
             headers=headers,
+            params=params,
             json=cleaned_rows,
         )
         logger.info(f"Supabase Response: {response.status_code}, {response.text}")
@@ -82,36 +90,74 @@ def clean_row(row, table_columns):
         # Only include keys that exist in the table schema
         if key in table_columns:
             # Ensure value compatibility (e.g., replace NaN or None with default)
-            cleaned_row[key] = value if pd.notnull(value) else None
+            cleaned_row[key] = None if value is None or (isinstance(value, float) and math.isnan(value)) else value
     return cleaned_row
 
 
-async def get_data(table: str, filters: str = "", page_size: int = 1000):
-    """Get all data from a Supabase table with optional filters, handling pagination."""
-    all_data = []
+async def iter_data(table: str, filters: str = "", page_size: int = 1000, key_column: str = None):
+    """Lazily yield pages of rows from a Supabase table with optional filters.
+
+    When `key_column` is given, pages are ordered by that unique column and fetched with keyset
+    pagination, which stays fast and stable at any depth; rows need to include the key column.
+    Keyset pagination only covers rows whose key is set (rows with a NULL key are skipped).
+    """
     offset = 0  # Start from the first record
+    last_key = None
 
     async with httpx.AsyncClient() as client:
         while True:
             # Append pagination parameters to the URL
-            pagination = f"&offset={offset}&limit={page_size}"
+            if key_column:
+                after = f"gt.{last_key}" if last_key is not None else "not.is.null"
+                pagination = f"&{key_column}={after}&order={key_column}.asc&limit={page_size}"
+            else:
+                pagination = f"&offset={offset}&limit={page_size}"
             url = f"{SUPABASE_URL}/rest/v1/{table}?{filters}{pagination}"
             response = await client.get(url, headers=HEADERS)
             response.raise_for_status()
-            
+
             # Parse the current batch of data
             current_data = response.json()
-            all_data.extend(current_data)
+            # Read the key before yielding, since consumers may modify the rows
+            if key_column and current_data:
+                last_key = current_data[-1].get(key_column)
+            if current_data:
+                yield current_data
 
             # Break if there are no more records to fetch
             if len(current_data) < page_size:
                 break
 
-            # Increment the offset to fetch the next batch
+            # Move past the current batch
             offset += page_size
+            if key_column and last_key is None:
+                # Without a key the next page would restart from the beginning
+                raise ValueError(f"Keyset pagination requires '{key_column}' in every row.")
 
+async def get_data(table: str, filters: str = "", page_size: int = 1000):
+    """Get all data from a Supabase table with optional filters, handling pagination."""
+    all_data = []
+    async for page in iter_data(table, filters, page_size):
+        all_data.extend(page)
     return all_data
 
+async def count_rows(table: str, filters: str = ""):
+    """Count the rows of a Supabase table (with optional filters) without fetching them."""
+    headers = {**HEADERS, "Prefer": "count=exact", "Range": "0-0"}
+    async with httpx.AsyncClient() as client:
+        response = await client.head(f"{SUPABASE_URL}/rest/v1/{table}?{filters}", headers=headers)
+        response.raise_for_status()
+        # Content-Range looks like "0-0/12345" (or "*/0" for an empty table)
+        return int(response.headers.get("content-range", "*/0").split("/")[-1])
+
+async def get_row_hashes(table: str, key_column: str, hash_column: str, keys: list):
+    """Fetch the stored content hashes for the given row keys as a {key: hash} mapping."""
+    if not keys:
+        return {}
+    filters = f"select={key_column},{hash_column}&{key_column}=in.({','.join(keys)})"
+    rows = await get_data(table, filters=filters, page_size=max(len(keys), 1))
+    return {row[key_column]: row[hash_column] for row in rows}
+
 async def update_data(table: str, filters: str, data: dict):
     """Update data in a Supabase table."""
     async with httpx.AsyncClient() as client:
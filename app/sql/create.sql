@@ -33,9 +33,19 @@ CREATE TABLE lending_club_loans (
     initial_list_status CHAR(1),
     mths_since_last_major_derog INT,
     policy_code INT,
-    is_bad BOOLEAN
+    is_bad BOOLEAN,
+    loan_key VARCHAR(16) PRIMARY KEY,  -- Hash of the loan URL (or of the row when it has no URL)
+    row_hash VARCHAR(16) NOT NULL  -- Content hash used to skip unchanged rows on re-upload
 );
 
+-- Migration for tables created before loan_key/row_hash existed.
+-- Rows loaded earlier keep NULL keys and are not deduplicated against new uploads.
+-- ALTER TABLE lending_club_loans ADD COLUMN IF NOT EXISTS loan_key VARCHAR(16);
+-- ALTER TABLE lending_club_loans ADD COLUMN IF NOT EXISTS row_hash VARCHAR(16);
+-- CREATE UNIQUE INDEX IF NOT EXISTS lending_club_loans_loan_key_idx ON lending_club_loans (loan_key);
+-- Backfill keys of rows with a URL (the same hash uploads compute); rows without one can be re-uploaded.
+-- UPDATE lending_club_loans SET loan_key = left(md5(url), 16) WHERE loan_key IS NULL AND url <> '';
+
 SELECT table_name
 FROM information_schema.tables
 WHERE table_name = 'lending_club_loans';
\ No newline at end of file
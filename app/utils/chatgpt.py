@@ -1,37 +1,39 @@
 import httpx
-import os
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+from app.services.llm_gateway import gateway
+
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant."}
+
+def build_messages(statistics, prompt):
+    """Build the chat messages for a summary request."""
+    return [
+        SYSTEM_MESSAGE,
+        {"role": "user", "content": prompt.format(statistics=statistics)},
+    ]
+
+def wrap_error(error):
+    """Convert gateway errors into the ValueError callers expect."""
+    if isinstance(error, ValueError):
+        return error
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            error_details = error.response.json()
+        except Exception:
+            error_details = error.response.text
+        return ValueError(f"HTTP error: {error.response.status_code}. Details: {error_details}")
+    return ValueError(f"Failed to generate summary: {str(error)}")
 
 async def generate_summary(statistics, prompt):
     """Generate a summary using ChatGPT based on the provided statistics and prompt."""
-    if not OPENAI_API_KEY:
-        raise ValueError("OpenAI API key is missing. Please set the OPENAI_API_KEY environment variable.")
+    try:
+        return await gateway.chat(build_messages(statistics, prompt))
+    except Exception as e:
+        raise wrap_error(e)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-3.5-turbo",  # Use the recommended model
-                    "messages": [
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": prompt.format(statistics=statistics)},
-                    ],
-                    "max_tokens": 150,
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"].strip()
-        except httpx.HTTPStatusError as http_err:
-            error_details = http_err.response.json()
-            raise ValueError(
-                f"HTTP error: {http_err.response.status_code}. Details: {error_details}"
-            )
-        except Exception as e:
-            raise ValueError(f"Failed to generate summary: {str(e)}")
+async def generate_summaries(requests):
+    """Generate several summaries concurrently from (statistics, prompt) pairs.
+
+    Returns the summaries in input order; failed requests are returned as ValueError instances.
+    """
+    results = await gateway.chat_many([build_messages(statistics, prompt) for statistics, prompt in requests])
+    return [wrap_error(result) if isinstance(result, BaseException) else result for result in results]
@@ -28,3 +28,11 @@ def normalize_emp_length(value):
         return 0.5
     match = re.search(r"(\d+)", value)
     return float(match.group(1)) if match else 0
+
+def normalize_rate(series):
+    """Convert rates to decimals, treating percentage strings (e.g. "10.5%") as percents."""
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors="coerce")
+    text = series.astype(str).str.strip()
+    numeric = pd.to_numeric(text.str.rstrip("%"), errors="coerce")
+    return numeric.where(~text.str.endswith("%"), numeric / 100)
\ No newline at end of file
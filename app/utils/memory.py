@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import asynccontextmanager, contextmanager
+
+# Memory budget for admitted work in MB (0 disables admission control and fallbacks)
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+# Trace Python allocations per stage with tracemalloc (slows allocation-heavy code)
+MEMORY_TRACE = os.getenv("MEMORY_TRACE", "false").lower() == "true"
+# Peak bytes per loaded row assumed before any stage has been measured
+DEFAULT_BYTES_PER_ROW = int(os.getenv("MEMORY_DEFAULT_BYTES_PER_ROW", "8192"))
+
+MB = 1024 * 1024
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-stage measurements keyed by stage name
+memory_metrics = {}
+# Traced-memory frames of the stages currently being measured (outermost first)
+trace_stack = []
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), falling back to the high-water mark."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, IndexError):
+        return rss_high_water_mb()
+
+def rss_high_water_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is reported in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@contextmanager
+def track_memory(stage: str, rows: int = None):
+    """Record RSS growth and (optionally) the tracemalloc peak of a stage.
+
+    Stages may nest. When stages run concurrently on the event loop their traced peaks overlap,
+    so treat them as upper bounds.
+    """
+    if MEMORY_TRACE and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    frame = None
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        if trace_stack:
+            trace_stack[-1]["peak"] = max(trace_stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frame = {"base": current, "peak": current}
+        trace_stack.append(frame)
+
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        traced_peak_mb = None
+        if frame is not None:
+            frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            trace_stack.remove(frame)
+            if trace_stack:
+                trace_stack[-1]["peak"] = max(trace_stack[-1]["peak"], frame["peak"])
+            traced_peak_mb = (frame["peak"] - frame["base"]) / MB
+
+        rss_after = current_rss_mb()
+        metrics = memory_metrics.setdefault(stage, {"runs": 0, "max_traced_peak_mb": None, "max_rss_growth_mb": 0.0})
+        metrics["runs"] += 1
+        metrics["last_duration_ms"] = (time.perf_counter() - started) * 1000
+        metrics["last_rss_before_mb"] = rss_before
+        metrics["last_rss_after_mb"] = rss_after
+        metrics["max_rss_growth_mb"] = max(metrics["max_rss_growth_mb"], rss_after - rss_before)
+        metrics["rss_high_water_mb"] = rss_high_water_mb()
+        if traced_peak_mb is not None:
+            metrics["last_traced_peak_mb"] = traced_peak_mb
+            metrics["max_traced_peak_mb"] = max(metrics["max_traced_peak_mb"] or 0.0, traced_peak_mb)
+        if rows:
+            metrics["last_rows"] = rows
+            # RSS rarely grows once freed memory is reused, so only traced peaks feed the estimates
+            if traced_peak_mb is not None:
+                metrics["peak_bytes_per_row"] = traced_peak_mb * MB / rows
+
+def estimate_mb(rows: int, *stages: str) -> float:
+    """Estimate the peak memory of running the largest of `stages` over `rows` rows.
+
+    Uses the bytes per row traced on earlier runs, or DEFAULT_BYTES_PER_ROW until one is traced.
+    """
+    measured = [memory_metrics[stage]["peak_bytes_per_row"] for stage in stages if "peak_bytes_per_row" in memory_metrics.get(stage, {})]
+    return rows * (max(measured) if measured else DEFAULT_BYTES_PER_ROW) / MB
+
+def within_budget(estimate: float) -> bool:
+    """Whether work of the estimated size may run in full without exceeding the budget."""
+    return not MEMORY_BUDGET_MB or estimate <= MEMORY_BUDGET_MB
+
+class MemoryAdmission:
+    """Admission control that queues memory-heavy work until its estimated memory fits the budget."""
+
+    def __init__(self, budget_mb: float = MEMORY_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self.reserved_mb = 0.0
+        self.waiting = 0
+        self.condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, estimate: float, stage: str = ""):
+        """Wait until `estimate` MB is available, hold it while the block runs, then release it."""
+        if not self.budget_mb:
+            yield
+            return
+
+        # Work larger than the whole budget still runs, but only on its own
+        amount = min(estimate, self.budget_mb)
+        async with self.condition:
+            if self.reserved_mb + amount > self.budget_mb:
+                logger.info(f"Queueing '{stage}' ({estimate:.0f} MB) until memory is available.")
+            self.waiting += 1
+            try:
+                await self.condition.wait_for(lambda: self.reserved_mb + amount <= self.budget_mb)
+            finally:
+                self.waiting -= 1
+            self.reserved_mb += amount
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.reserved_mb -= amount
+                self.condition.notify_all()
+
+admission = MemoryAdmission()
+
+def memory_report() -> dict:
+    """Current memory usage, budget state and per-stage measurements."""
+    return {
+        "budget_mb": MEMORY_BUDGET_MB or None,
+        "reserved_mb": admission.reserved_mb,
+        "waiting": admission.waiting,
+        "rss_mb": current_rss_mb(),
+        "rss_high_water_mb": rss_high_water_mb(),
+        "tracing": tracemalloc.is_tracing(),
+        "stages": memory_metrics,
+    }
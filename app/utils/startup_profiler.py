@@ -0,0 +1,139 @@
+import importlib.abc
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Enable with STARTUP_PROFILE=true to record import and lifespan timings
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+# Initialize logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def process_start_time() -> float:
+    """Wall-clock time the process started (Linux), falling back to when this module was imported."""
+    try:
+        with open("/proc/self/stat") as stat_file:
+            # The command name may contain spaces, so split after its closing parenthesis
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as system_stat:
+            boot_time = next(int(line.split()[1]) for line in system_stat if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+profile = {
+    "process_started_at": process_start_time(),
+    "imports": {},
+    "phases": {},
+    "time_to_first_response_seconds": None,
+}
+
+class TimedLoader(importlib.abc.Loader):
+    """Loader proxy that records how long a module takes to import."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self.timer.stack.pop()
+            if self.timer.stack:
+                self.timer.stack[-1] += elapsed
+            profile["imports"][module.__name__] = {"cumulative_ms": elapsed * 1000, "self_ms": (elapsed - children) * 1000}
+            # Hand the module back its real loader so nothing downstream sees the proxy
+            module.__loader__ = self.loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self.loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder that wraps every module loader in a TimedLoader."""
+
+    def __init__(self):
+        # Modules may be imported from worker threads, so keep one nesting stack per thread
+        self.local = threading.local()
+
+    @property
+    def stack(self) -> list:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+import_timer = ImportTimer()
+
+def install():
+    """Start timing imports; call before importing the rest of the application."""
+    if STARTUP_PROFILE and import_timer not in sys.meta_path:
+        sys.meta_path.insert(0, import_timer)
+
+@contextmanager
+def phase(name: str):
+    """Time a named startup phase (no-op unless profiling is enabled)."""
+    if not STARTUP_PROFILE:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile["phases"][name] = {
+            "duration_ms": (time.perf_counter() - started) * 1000,
+            "finished_after_start_seconds": time.time() - profile["process_started_at"],
+        }
+
+def mark_first_response():
+    """Record the time from process start to the first response."""
+    if profile["time_to_first_response_seconds"] is None:
+        profile["time_to_first_response_seconds"] = time.time() - profile["process_started_at"]
+        logger.info(f"First response sent {profile['time_to_first_response_seconds']:.3f}s after process start.")
+
+def report(top: int = 25) -> dict:
+    """Return phase timings, time to first response and the slowest imports."""
+    imports = sorted(profile["imports"].items(), key=lambda item: -item[1]["cumulative_ms"])
+    return {
+        "process_started_at": profile["process_started_at"],
+        "time_to_first_response_seconds": profile["time_to_first_response_seconds"],
+        "phases": profile["phases"],
+        "modules_imported": len(imports),
+        "slowest_imports": [{"module": name, **timing} for name, timing in imports[:top]],
+        "slowest_self_imports": [
+            {"module": name, **timing}
+            for name, timing in sorted(profile["imports"].items(), key=lambda item: -item[1]["self_ms"])[:top]
+        ],
+    }
+
+def log_report(top: int = 10):
+    """Log a compact startup profile."""
+    summary = report(top)
+    for name, timing in summary["phases"].items():
+        logger.info(f"Startup phase '{name}': {timing['duration_ms']:.1f} ms")
+    for entry in summary["slowest_imports"]:
+        logger.info(f"Import {entry['module']}: {entry['cumulative_ms']:.1f} ms cumulative, {entry['self_ms']:.1f} ms self")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# app.config refuses to load without Supabase credentials; tests mock every Supabase call
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+import app.analysis.analysis_functions as analysis_functions
+from app.analysis import cache as analysis_cache
+from app.services.llm_gateway import gateway
+
+# No loan has defaulted, so temporal_default_trends raises
+LOANS = [
+    {"loan_amnt": 1000.0 + i, "grade": "AB"[i % 2], "addr_state": "CA", "is_bad": False, "earliest_cr_line": "01/01/99"}
+    for i in range(20)
+]
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    async def get_data(table, *args, **kwargs):
+        return [dict(row) for row in LOANS]
+
+    async def chat(messages, **kwargs):
+        return "summary"
+
+    monkeypatch.setattr(analysis_functions, "get_data", get_data)
+    monkeypatch.setattr(gateway, "chat", chat)
+    monkeypatch.setattr(analysis_cache, "cache", {})
+
+def test_failed_analysis_keeps_the_others(fake_backends):
+    asyncio.run(analysis_cache.initialize_cache("exact"))
+    cached = analysis_cache.cache
+
+    assert "temporal_trends" not in cached
+    assert "final_report" not in cached
+    assert {"loan_distribution", "grade_defaults", "state_defaults"} <= set(cached)
+    assert cached["grade_defaults"]["summary"] == "summary"
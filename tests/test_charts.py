@@ -0,0 +1,13 @@
+import numpy as np
+
+from app.analysis.charts import HISTOGRAM_MAX_BINS, histogram_chart
+
+def test_histogram_reports_the_binning_used():
+    values = np.random.default_rng(0).normal(size=1000)
+    assert histogram_chart(values, "t", "x", bins="fd")["binning"] == "fd"
+
+    # A heavy tail makes Freedman-Diaconis ask for far more than HISTOGRAM_MAX_BINS bins
+    heavy_tail = np.concatenate([values, [1e6]])
+    chart = histogram_chart(heavy_tail, "t", "x", bins="fd")
+    assert len(chart["series"]["count"]) == HISTOGRAM_MAX_BINS
+    assert chart["binning"] == f"fd (capped to {HISTOGRAM_MAX_BINS} equal-width bins)"
@@ -0,0 +1,69 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.supabase_client as supabase_client
+from app.main import app
+
+ROWS = pd.DataFrame(
+    {
+        "loan_amnt": [1000, 2500.5, 12000],
+        "term": [" 36 months", " 60 months", " 36 months"],
+        "int_rate": ["10.5%", "7.25%", "15%"],
+        "grade": ["A", "B", "C"],
+        "url": ["https://example.com/loan/1", "https://example.com/loan/2", ""],
+        "delinq_2yrs": [0, 2, 1],
+        "is_bad": [False, True, False],
+    }
+)
+
+def encode(fmt: str) -> tuple:
+    """Serialize ROWS in an upload format, returning (filename, bytes)."""
+    if fmt == "csv":
+        return "loans.csv", ROWS.to_csv(index=False).encode()
+    if fmt == "csv.gz":
+        return "loans.csv.gz", gzip.compress(ROWS.to_csv(index=False).encode())
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        ROWS.to_parquet(buffer)
+        return "loans.parquet", buffer.getvalue()
+    return "loans.ndjson", ROWS.to_json(orient="records", lines=True).encode()
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory stand-in for the Supabase table, keyed by loan_key."""
+    rows = {}
+
+    async def get_row_hashes(table, key_column, hash_column, keys):
+        return {key: rows[key][hash_column] for key in keys if key in rows}
+
+    async def insert_data(table, batch, on_conflict=None):
+        for row in batch:
+            rows[row[on_conflict]] = row
+
+    monkeypatch.setattr(supabase_client, "get_row_hashes", get_row_hashes)
+    monkeypatch.setattr(supabase_client, "insert_data", insert_data)
+    return rows
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "parquet", "ndjson"])
+def test_reupload_in_any_format_skips_unchanged_rows(store, fmt):
+    client = TestClient(app)
+    first = client.post("/api/data-processing/upload", files={"file": encode("csv")})
+    assert first.json()["inserted"] == len(ROWS)
+
+    response = client.post("/api/data-processing/upload", files={"file": encode(fmt)})
+    assert response.status_code == 200
+    assert response.json()["skipped"] == len(ROWS)
+    assert response.json()["inserted"] == response.json()["updated"] == 0
+    assert len(store) == len(ROWS)
+
+def test_loan_key_matches_sql_backfill(store):
+    import hashlib
+
+    TestClient(app).post("/api/data-processing/upload", files={"file": encode("parquet")})
+    # Same key as: UPDATE ... SET loan_key = left(md5(url), 16)
+    expected = {hashlib.md5(url.encode()).hexdigest()[:16] for url in ROWS["url"] if url}
+    assert expected <= set(store)
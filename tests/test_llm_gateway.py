@@ -0,0 +1,98 @@
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.llm_gateway import LLMGateway
+
+mock_openai = FastAPI()
+# Responses the mock server returns in order, as (status_code, headers, delay_seconds)
+script = []
+stats = {"calls": 0, "in_flight": 0, "peak": 0}
+
+@mock_openai.post("/chat/completions")
+async def chat_completions(request: Request):
+    stats["calls"] += 1
+    stats["in_flight"] += 1
+    stats["peak"] = max(stats["peak"], stats["in_flight"])
+    status_code, headers, delay = script.pop(0) if script else (200, {}, 0.05)
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        stats["in_flight"] -= 1
+    if status_code != 200:
+        return JSONResponse({"error": {"message": "mock error"}}, status_code=status_code, headers=headers)
+    return {"choices": [{"message": {"content": " mock summary "}}]}
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Run the mock OpenAI server on a free local port for the duration of the module."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock_openai, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+@pytest.fixture(autouse=True)
+def reset_mock():
+    script.clear()
+    stats.update(calls=0, in_flight=0, peak=0)
+
+def make_gateway(base_url, **kwargs):
+    settings = {"api_key": "test", "requests_per_minute": 6000, "tokens_per_minute": 1e6, "max_retries": 3, "deadline": 5}
+    return LLMGateway(base_url=base_url, **{**settings, **kwargs})
+
+async def chat(gateway, **kwargs):
+    try:
+        return await gateway.chat([{"role": "user", "content": "hi"}], **kwargs)
+    finally:
+        await gateway.aclose()
+
+def test_retries_rate_limits_and_server_errors(base_url):
+    script.extend([(429, {"Retry-After": "0"}, 0), (503, {"Retry-After": "0"}, 0), (500, {"Retry-After": "0"}, 0)])
+    assert asyncio.run(chat(make_gateway(base_url))) == "mock summary"
+    assert stats["calls"] == 4
+
+def test_gives_up_after_max_retries(base_url):
+    script.extend([(503, {"Retry-After": "0"}, 0)] * 3)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(chat(make_gateway(base_url, max_retries=2)))
+    assert stats["calls"] == 3
+
+def test_honours_retry_after(base_url):
+    script.append((429, {"Retry-After": "0.5"}, 0))
+    started = time.perf_counter()
+    asyncio.run(chat(make_gateway(base_url)))
+    assert time.perf_counter() - started >= 0.5
+
+def test_deadline_bounds_the_whole_call(base_url):
+    script.append((200, {}, 2.0))
+    started = time.perf_counter()
+    with pytest.raises(ValueError, match="deadline"):
+        asyncio.run(chat(make_gateway(base_url), deadline=0.3))
+    assert time.perf_counter() - started < 1.5
+
+def test_concurrency_limit(base_url):
+    script.extend([(200, {}, 0.1)] * 8)
+    gateway = make_gateway(base_url, max_concurrency=2)
+
+    async def run():
+        try:
+            return await gateway.chat_many([[{"role": "user", "content": f"q{i}"}] for i in range(8)])
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(run()) == ["mock summary"] * 8
+    assert stats["peak"] == 2
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.analysis import risk_model
+from app.main import app
+
+@pytest.fixture
+def model(monkeypatch):
+    """Register a model trained on decimal interest rates where higher rates default more often."""
+    rng = np.random.default_rng(0)
+    int_rate = rng.uniform(0.05, 0.25, 2000)
+    loans = pd.DataFrame(
+        {
+            "int_rate": int_rate,
+            "term": rng.choice([" 36 months", " 60 months"], 2000),
+            "is_bad": (rng.uniform(size=2000) < int_rate * 2).astype(int),
+        }
+    )
+    entry = risk_model.fit_model(loans)
+    entry["version"] = 1
+    monkeypatch.setattr(risk_model, "registry", {"versions": {1: entry}, "active": 1, "training": False})
+
+def score_json(client, applicants):
+    response = client.post("/api/risk-scoring/score", json=applicants)
+    assert response.status_code == 200
+    return response.json()["probabilities"]
+
+def score_csv(client, body):
+    response = client.post("/api/risk-scoring/score", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    return response.json()["probabilities"]
+
+def test_percentage_and_decimal_rates_score_the_same(model):
+    client = TestClient(app)
+    percent = score_json(client, [{"int_rate": "10.5%", "term": 36}, {"int_rate": "25%", "term": 36}])
+    decimal = score_json(client, [{"int_rate": 0.105, "term": 36}, {"int_rate": 0.25, "term": 36}])
+    assert percent == pytest.approx(decimal)
+    # The rate must actually reach the model rather than being imputed
+    assert percent[1] > percent[0]
+
+    csv_percent = score_csv(client, "int_rate,term\n10.5%,36\n25%,36\n")
+    csv_decimal = score_csv(client, "int_rate,term\n0.105,36\n0.25,36\n")
+    assert csv_percent == pytest.approx(decimal)
+    assert csv_decimal == pytest.approx(decimal)
+
+def test_invalid_csv_is_rejected(model):
+    response = TestClient(app).post("/api/risk-scoring/score", content="", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
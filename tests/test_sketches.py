@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.analysis.approximate import LoanSketches
+from app.analysis.sketches import CategoryCounter, FixedWidthHistogram, KLLSketch, ReservoirSample, StreamingMoments
+
+rng = np.random.default_rng(42)
+VALUES = rng.lognormal(9, 0.6, 60000)
+KEYS = rng.zipf(1.5, 60000) % 5000
+PAGES = np.array_split(np.arange(VALUES.size), 12)
+
+def build(make, update):
+    """Return (sketch over all values, sketch merged from per-page sketches)."""
+    whole = make()
+    update(whole, slice(None))
+    merged = make()
+    for page in PAGES:
+        part = make()
+        update(part, page)
+        merged.merge(part)
+    return whole, merged
+
+def test_kll_merge_stays_within_rank_error():
+    whole, merged = build(lambda: KLLSketch(k=200, seed=1), lambda sketch, rows: sketch.update(VALUES[rows]))
+    fractions = np.linspace(0.01, 0.99, 25)
+    assert merged.n == whole.n == VALUES.size
+    for sketch in (whole, merged):
+        # Rank of each estimate in the true data must be within the reported normalized rank error
+        ranks = np.searchsorted(np.sort(VALUES), sketch.quantiles(fractions)) / VALUES.size
+        assert np.abs(ranks - fractions).max() <= sketch.rank_error
+
+def test_moments_and_histogram_merge_exactly():
+    whole, merged = build(StreamingMoments, lambda sketch, rows: sketch.update(VALUES[rows]))
+    assert (merged.n, merged.minimum, merged.maximum) == (whole.n, whole.minimum, whole.maximum)
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.std == pytest.approx(VALUES.std(ddof=1))
+
+    whole, merged = build(lambda: FixedWidthHistogram(500), lambda sketch, rows: sketch.update(VALUES[rows]))
+    assert merged.counts == whole.counts
+
+def test_category_counter_merge_stays_within_error_bound():
+    whole, merged = build(lambda: CategoryCounter(max_exact=100), lambda sketch, rows: sketch.update(KEYS[rows].tolist()))
+    assert not merged.exact
+    true_counts = dict(zip(*np.unique(KEYS, return_counts=True)))
+    for sketch in (whole, merged):
+        for key, count in sketch.counts().items():
+            assert true_counts[key] <= count <= true_counts[key] + sketch.error_bound
+
+def test_reservoir_merge_keeps_a_uniform_sample():
+    rows = np.arange(VALUES.size)
+    whole, merged = build(lambda: ReservoirSample(2000, seed=3), lambda sketch, page: sketch.update(rows[page].tolist()))
+    for sketch in (whole, merged):
+        sample = np.array(sketch.rows)
+        assert sketch.n == len(rows) and sample.size == 2000 and np.unique(sample).size == 2000
+        # Each page should contribute in proportion to its size
+        assert abs((sample < len(rows) / 2).mean() - 0.5) < 0.05
+
+def test_loan_sketches_without_is_bad_still_track_amounts():
+    sketches = LoanSketches()
+    sketches.update([{"loan_amnt": value} for value in VALUES[:100]])
+    assert sketches.loan_moments.n == 100